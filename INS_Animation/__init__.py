@@ -1,4 +1,10 @@
 from .transition import Transition, transition, TransitionGroup
-from .easing_function import linear, ease, ease_in, ease_in_out, ease_out, \
-    CubicBezier, parse_easing_function, is_easing_function
+from .easing_function import CubicBezier, parse_easing_function, is_easing_function
 from .parse_type import parse_time
+from . import easing_function as _easing_function
+
+
+def __getattr__(name):  # linear、ease 等预定义缓动函数在第一次访问时才创建
+    if name in _easing_function.PREDEFINED_EASING_NAMES:
+        return getattr(_easing_function, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,22 +1,39 @@
 from .cubic_bezier import CubicBezier
-import re
-
-
-# 预定义的缓动函数
-linear = CubicBezier(0.0, 0.0, 1.0, 1.0)
-ease = CubicBezier(0.25, 0.1, 0.25, 1.0)
-ease_in = CubicBezier(0.42, 0.0, 1.0, 1.0)
-ease_out = CubicBezier(0.0, 0.0, 0.58, 1.0)
-ease_in_out = CubicBezier(0.42, 0.0, 0.58, 1.0)
-
-# 预定义缓动函数的映射字典
-PREDEFINED_EASING = {
-    'linear': linear,
-    'ease': ease,
-    'ease-in': ease_in,
-    'ease-out': ease_out,
-    'ease-in-out': ease_in_out
+
+
+# 预定义缓动函数的参数，对应的 CubicBezier 在第一次用到时才创建
+PREDEFINED_EASING_PARAMS = {
+    'linear': (0.0, 0.0, 1.0, 1.0),
+    'ease': (0.25, 0.1, 0.25, 1.0),
+    'ease-in': (0.42, 0.0, 1.0, 1.0),
+    'ease-out': (0.0, 0.0, 0.58, 1.0),
+    'ease-in-out': (0.42, 0.0, 0.58, 1.0)
 }
+PREDEFINED_EASING = {}  # 已创建的预定义缓动函数
+
+# 模块属性名 -> 预定义缓动函数名称
+PREDEFINED_EASING_NAMES = {
+    'linear': 'linear',
+    'ease': 'ease',
+    'ease_in': 'ease-in',
+    'ease_out': 'ease-out',
+    'ease_in_out': 'ease-in-out'
+}
+
+
+def get_predefined_easing(name):
+    easing = PREDEFINED_EASING.get(name)
+    if easing is None:
+        # 预定义缓动函数使用查找表：查表得到初始值后只需一次牛顿迭代，精度与 Solve 相同
+        easing = PREDEFINED_EASING[name] = CubicBezier(*PREDEFINED_EASING_PARAMS[name]).use_table()
+    return easing
+
+
+def __getattr__(name):  # linear、ease 等预定义缓动函数在第一次访问时才创建
+    if name in PREDEFINED_EASING_NAMES:
+        easing = globals()[name] = get_predefined_easing(PREDEFINED_EASING_NAMES[name])
+        return easing
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def is_easing_function(data):
@@ -31,6 +48,8 @@ def parse_easing_function(easing_function):
     if isinstance(easing_function, str):
         # 处理 cubic-bezier 格式
         if easing_function.startswith('cubic-bezier'):
+            import re
+
             # 匹配括号内的数字序列
             match = re.search(r'cubic-bezier\(([^)]+)\)', easing_function)
             if not match:
@@ -50,7 +69,7 @@ def parse_easing_function(easing_function):
             return CubicBezier(*numbers)
 
         # 处理预定义的缓动函数名称
-        if easing_function in PREDEFINED_EASING:
-            return PREDEFINED_EASING[easing_function]
+        if easing_function in PREDEFINED_EASING_PARAMS:
+            return get_predefined_easing(easing_function)
 
     raise ValueError(f"无法解析此格式: {easing_function}")
@@ -1,24 +1,39 @@
+import bisect
 import math
 import sys
-import numpy as np
 
 
-np.seterr(divide='ignore')
+np = None  # numpy 在第一次用到时才导入（只有批量计算和构建查找表需要）
 
 
 kMaxNewtonIterations = 4  # 最大牛顿迭代次数
+kMaxBisectionIterations = 64  # 批量计算时二分的最大次数
 kBezierEpsilon = 1e-7
 CUBIC_BEZIER_SPLINE_SAMPLES = 11
+EASING_TABLE_SIZE = 4096  # 查找表的分段数（共 EASING_TABLE_SIZE + 1 个采样点）
 FLOAT_MAX = sys.float_info.max
 FLOAT_MIN = -sys.float_info.max
 
 
+def import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
 def clamp(x, _min, _max):
     return _min if x < _min else (_max if x > _max else x)
 
 
-def my_divide(a, b):
-    return np.divide(a, b)
+def my_divide(a, b):  # 按 IEEE 规则相除：除以 0 得到 ±inf（0 / 0 得到 nan），不抛出异常
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if not a or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
 
 
 class CubicBezier:
@@ -28,6 +43,7 @@ class CubicBezier:
         self.start_gradient_ = self.end_gradient_ = 0
         self.range_min_ = self.range_max_ = 0
         self.spline_samples_ = [0] * CUBIC_BEZIER_SPLINE_SAMPLES
+        self.table_ = None  # 查找表：等距进度值对应的结果，None 表示不使用查找表
 
         self.InitCoefficients(p1x, p1y, p2x, p2y)
         self.InitGradients(p1x, p1y, p2x, p2y)
@@ -38,7 +54,10 @@ class CubicBezier:
         return ((self.ax_ * t + self.bx_) * t + self.cx_) * t
 
     def SampleCurveY(self, t):
-        return self.ToFinite(((self.ay_ * t + self.by_) * t + self.cy_) * t)
+        y = ((self.ay_ * t + self.by_) * t + self.cy_) * t
+        if FLOAT_MIN <= y <= FLOAT_MAX:  # 绝大多数情况下结果有限，不必再调用 ToFinite
+            return y
+        return self.ToFinite(y)
 
     def SampleCurveDerivativeX(self, t):
         return (3.0 * self.ax_ * t + 2.0 * self.bx_) * t + self.cx_
@@ -59,21 +78,21 @@ class CubicBezier:
 
         # 对样条曲线进行线性插值以获取初始猜测，来减小牛顿迭代法计算次数
         delta_t = 1.0 / (CUBIC_BEZIER_SPLINE_SAMPLES - 1)
-        for i in range(CUBIC_BEZIER_SPLINE_SAMPLES):
-            if x <= self.spline_samples_[i]:
-                t1 = delta_t * i
-                t0 = t1 - delta_t
-                t2 = t0 + (t1 - t0) * (x - self.spline_samples_[i - 1]) / \
-                                      (self.spline_samples_[i] - self.spline_samples_[i - 1])
-                break
-
-        # 先进行牛顿迭代法
+        samples = self.spline_samples_
+        i = bisect.bisect_left(samples, x)  # 第一个不小于 x 的采样点
+        if i < CUBIC_BEZIER_SPLINE_SAMPLES:
+            t1 = delta_t * i
+            t0 = t1 - delta_t
+            t2 = t0 + (t1 - t0) * (x - samples[i - 1]) / (samples[i] - samples[i - 1])
+
+        # 先进行牛顿迭代法（多项式直接展开计算，省去方法调用）
+        ax, bx, cx = self.ax_, self.bx_, self.cx_
         newton_epsilon = min(kBezierEpsilon, epsilon)
         for i in range(kMaxNewtonIterations):
-            x2 = self.SampleCurveX(t2) - x
+            x2 = ((ax * t2 + bx) * t2 + cx) * t2 - x
             if abs(x2) < newton_epsilon:  # 精度足够
                 return t2
-            d2 = self.SampleCurveDerivativeX(t2)
+            d2 = (3.0 * ax * t2 + 2.0 * bx) * t2 + cx
             if abs(d2) < kBezierEpsilon:
                 break
             t2 = t2 - x2 / d2
@@ -95,8 +114,83 @@ class CubicBezier:
         return t2
 
     def Solve(self, x):
+        if self.table_ is not None and 0.0 <= x <= 1.0:
+            return self.SolveFromTable(x)
         return self.SolveWithEpsilon(x, kBezierEpsilon)
 
+    def SolveFromTable(self, x):  # 须保证 0 <= x <= 1
+        return self.SampleCurveY(self.SolveCurveXFromTable(x))
+
+    def SolveCurveXFromTable(self, x):  # 查表插值得到 t 并用一次牛顿迭代修正
+        table = self.table_
+        pos = x * (len(table) - 1)
+        i = min(int(pos), len(table) - 2)
+        t = table[i] + (table[i + 1] - table[i]) * (pos - i)
+
+        ax, bx, cx = self.ax_, self.bx_, self.cx_
+        x2 = ((ax * t + bx) * t + cx) * t - x
+        d2 = (3.0 * ax * t + 2.0 * bx) * t + cx
+        if abs(d2) >= kBezierEpsilon:
+            t -= x2 / d2
+            x2 = ((ax * t + bx) * t + cx) * t - x
+        if abs(x2) >= kBezierEpsilon:  # 精度不够（如曲线端点处导数为 0）时退回到完整的求解
+            t = self.SolveCurveX(x, kBezierEpsilon)
+        return t
+
+    def use_table(self, size=EASING_TABLE_SIZE):  # 查找表模式：预先求出 size + 1 个等距进度值对应的 t，之后 Solve 查表；size 为 None 时关闭
+        # 查表结果与 Solve 的精度保证相同：x 方向的误差小于 kBezierEpsilon
+        if size is None:
+            self.table_ = None
+        else:
+            np = import_numpy()
+            self.table_ = self.SolveCurveXMany(np.linspace(0.0, 1.0, size + 1), kBezierEpsilon).tolist()
+        return self
+
+    def SolveCurveXMany(self, x, epsilon):  # SolveCurveX 的向量化版本，x 为 [0, 1] 内的 numpy 数组
+        np = import_numpy()
+        delta_t = 1.0 / (CUBIC_BEZIER_SPLINE_SAMPLES - 1)
+        spline_t = np.arange(CUBIC_BEZIER_SPLINE_SAMPLES) * delta_t
+        t = np.interp(x, self.spline_samples_, spline_t)  # 对样条曲线线性插值作为初始猜测
+
+        # 先进行牛顿迭代法，已收敛或导数过小的元素不再迭代
+        newton_epsilon = min(kBezierEpsilon, epsilon)
+        for i in range(kMaxNewtonIterations):
+            x2 = ((self.ax_ * t + self.bx_) * t + self.cx_) * t - x
+            d2 = (3.0 * self.ax_ * t + 2.0 * self.bx_) * t + self.cx_
+            step = (np.abs(x2) >= newton_epsilon) & (np.abs(d2) >= kBezierEpsilon)
+            if not step.any():
+                break
+            t = np.where(step, t - x2 / np.where(step, d2, 1.0), t)
+
+        # 没有收敛的元素在其所在的样条区间内二分
+        pending = np.flatnonzero(np.abs(((self.ax_ * t + self.bx_) * t + self.cx_) * t - x) >= epsilon)
+        if len(pending):
+            target = x[pending]
+            index = np.searchsorted(self.spline_samples_, target).clip(1, CUBIC_BEZIER_SPLINE_SAMPLES - 1)
+            t1 = spline_t[index]
+            t0 = t1 - delta_t
+            t2 = (t0 + t1) * 0.5
+            for i in range(kMaxBisectionIterations):
+                x2 = ((self.ax_ * t2 + self.bx_) * t2 + self.cx_) * t2
+                done = np.abs(x2 - target) < epsilon
+                if done.all():
+                    break
+                t0 = np.where(done | (target <= x2), t0, t2)
+                t1 = np.where(done | (target > x2), t1, t2)
+                t2 = np.where(done, t2, (t0 + t1) * 0.5)
+            t[pending] = t2
+        return t
+
+    def solve_many(self, x, epsilon=kBezierEpsilon):  # 批量计算：x 为进度值组成的数组（或序列），一次向量化计算，返回 numpy 数组
+        np = import_numpy()
+        x = np.asarray(x, dtype=np.float64)
+        t = self.SolveCurveXMany(np.clip(x, 0.0, 1.0), epsilon)
+        with np.errstate(over='ignore', invalid='ignore'):
+            y = ((self.ay_ * t + self.by_) * t + self.cy_) * t
+            y = np.where(x < 0.0, self.start_gradient_ * x, y)
+            y = np.where(x > 1.0, 1.0 + self.end_gradient_ * (x - 1.0), y)
+        return np.clip(y, FLOAT_MIN, FLOAT_MAX)
+
     def SolveWithEpsilon(self, x, epsilon):
         if x < 0.0:
             return self.ToFinite(0.0 + self.start_gradient_ * x)
@@ -1,4 +1,4 @@
-from .easing_function import parse_easing_function, ease
+from .easing_function import parse_easing_function
 from .parse_type import parse_time
 import time
 
@@ -9,20 +9,20 @@ def lerp(t: float, key, value1, value2):
 
 class Transition:
     def __init__(self, transition_property: tuple, transition_duration=0,
-                 transition_timing_function=ease, transition_delay=0,
+                 transition_timing_function='ease', transition_delay=0,
                  lerp_function=lerp):
         self.lerp = lerp_function
         self.property_class, self.property, self.res = transition_property
         self.duration = transition_duration
-        self.timing_function = transition_timing_function
+        self.timing_function = parse_easing_function(transition_timing_function)
         self.delay = transition_delay
 
         self.start_time = None
         self.play = False
         self.start_property = None
 
-    def start(self):
-        self.start_time = time.time() + self.delay
+    def start(self, now=None):  # now: 当前时间，不传入时读取系统时间
+        self.start_time = (time.time() if now is None else now) + self.delay
         self.play = True
         self.start_property = getattr(self.property_class, self.property)
 
@@ -31,13 +31,14 @@ class Transition:
         self.play = False
         self.start_property = None
 
-    def update(self):
-        curv_time = time.time()
+    def update(self, now=None):
+        curv_time = time.time() if now is None else now
         if not self.play or self.start_time is None:
             return
         if curv_time < self.start_time:
             return
         if curv_time > self.start_time + self.duration:
+            setattr(self.property_class, self.property, self.lerp(1, self.property, self.start_property, self.res))
             self.stop()
             return
 
@@ -47,7 +48,7 @@ class Transition:
 
 
 def transition(transition_property: tuple, transition_duration='0s',
-               transition_timing_function=ease, transition_delay='0s',
+               transition_timing_function='ease', transition_delay='0s',
                lerp_function=lerp):
     return Transition(transition_property, parse_time(transition_duration),
                       parse_easing_function(transition_timing_function),
@@ -65,17 +66,17 @@ class TransitionGroup:
             for t in _transition:
                 self.transition.append(t)
 
-    def start(self):
+    def start(self, now=None):
         for t in self.transition:
-            t.start()
+            t.start(now)
 
     def stop(self):
         for t in self.transition:
             t.stop()
 
-    def update(self):
+    def update(self, now=None):
         for t in self.transition:
-            t.update()
+            t.update(now)
 
     @property
     def play(self):
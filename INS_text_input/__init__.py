@@ -1 +1,3 @@
 from .text_input import TextInput
+from .event_router import EventRouter
+from .frame_clock import FrameClock
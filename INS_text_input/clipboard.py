@@ -1,24 +1,166 @@
-try:
-    import pyperclip
-    USE_PYPERCLIP = True
-except ImportError:
-    USE_PYPERCLIP = False
-import pyperclip
+import collections
+import time
+
+
+USE_PYPERCLIP = None  # 是否使用 pyperclip，None 表示尚未检测（第一次读写剪贴板时才导入）
+
+
+def use_pyperclip():
+    global USE_PYPERCLIP
+    if USE_PYPERCLIP is None:
+        try:
+            import pyperclip  # noqa: F401
+            USE_PYPERCLIP = True
+        except ImportError:
+            USE_PYPERCLIP = False
+    return USE_PYPERCLIP
+
+
+class FakeClipboard:  # 模拟的剪贴板后端（可模拟读写延迟），用于无界面环境下的测试
+    def __init__(self, text='', delay=0.0):
+        self.text = text
+        self.delay = delay  # 每次读写耗时（秒）
+        self.blocking = delay > 0  # 读写是否会阻塞，阻塞时在后台线程中执行
+
+    def copy(self, text):
+        time.sleep(self.delay)
+        self.text = text
+
+    def paste(self):
+        time.sleep(self.delay)
+        return self.text
 
 
 class ClipBoard:
     _clipboard = ''
+    backend = None  # 自定义的剪贴板后端（提供 copy、paste 和 blocking），None 时使用 pyperclip 或进程内剪贴板
+
+    @staticmethod
+    def is_blocking():  # 读写剪贴板是否可能阻塞（pyperclip 在 Linux 上需要调用 xclip/xsel）
+        if ClipBoard.backend is not None:
+            return ClipBoard.backend.blocking
+        return use_pyperclip()
 
     @staticmethod
     def copy(text):
-        if USE_PYPERCLIP:
+        if ClipBoard.backend is not None:
+            ClipBoard.backend.copy(text)
+        elif use_pyperclip():
+            import pyperclip
             pyperclip.copy(text)
         else:
             ClipBoard._clipboard = text
 
     @staticmethod
     def paste():
-        if USE_PYPERCLIP:
+        if ClipBoard.backend is not None:
+            return ClipBoard.backend.paste()
+        elif use_pyperclip():
+            import pyperclip
             return pyperclip.paste()
         else:
             return ClipBoard._clipboard
+
+
+class ClipboardWorker:  # 后台剪贴板线程：复制、粘贴不阻塞渲染，完成后在渲染线程中调用回调
+    def __init__(self):
+        self.requests = None  # 请求队列，第一次需要后台线程时才创建
+        self.results = collections.deque()  # 已完成的请求 (结果, 回调)，deque 的 append/popleft 是线程安全的
+        self.last_value = ''  # 最近一次已知的剪贴板内容，读写失败时使用
+        self.pending = 0  # 尚未完成的请求数
+        self.thread = None
+
+    def _submit(self, func, arg, callback):
+        self.pending += 1
+        if not ClipBoard.is_blocking():  # 不会阻塞的剪贴板直接执行
+            self.results.append((self._call(func, arg), callback))
+            self.poll()
+            return
+        if self.thread is None:
+            import queue
+            import threading
+            self.requests = queue.Queue()
+            self.thread = threading.Thread(target=self._run, name='clipboard', daemon=True)
+            self.thread.start()
+        self.requests.put((func, arg, callback))
+
+    @staticmethod
+    def _call(func, arg):
+        try:
+            return func(arg)
+        except Exception:  # 剪贴板不可用（如缺少 xclip/xsel）
+            return None
+
+    def _run(self):
+        while True:
+            func, arg, callback = self.requests.get()
+            self.results.append((self._call(func, arg), callback))
+            func = arg = callback = None  # 等待下一个请求时不再引用回调（以及回调所属的输入框）
+
+    @staticmethod
+    def _copy(text):
+        if not isinstance(text, str):  # 多行文字在后台线程中拼接
+            text = '\n'.join(text)
+        ClipBoard.copy(text)
+        return text
+
+    @staticmethod
+    def _paste(_):
+        return ClipBoard.paste()
+
+    def copy(self, text, callback=None):  # 复制文字，text 可以是各行组成的列表
+        if isinstance(text, str):
+            self.last_value = text
+        self._submit(self._copy, text, callback)
+
+    def paste(self, callback):  # 读取剪贴板，完成后以读到的文字调用 callback
+        self._submit(self._paste, None, callback)
+
+    def poll(self):  # 在渲染线程中每帧调用，处理已完成的请求
+        while self.results:
+            result, callback = self.results.popleft()
+            self.pending -= 1
+            if result is None:
+                result = self.last_value
+            else:
+                self.last_value = result
+            if callback is not None:
+                callback(result)
+
+
+class ClipboardClient:  # 单个输入框的剪贴板请求：只统计自己尚未完成的请求，关闭后不再调用回调
+    def __init__(self, worker):
+        self.worker: ClipboardWorker = worker
+        self.pending = 0  # 本输入框尚未完成的请求数
+        self.closed = False
+
+    def _track(self, callback):  # 包装回调：请求完成时计数减一，关闭后丢弃结果
+        self.pending += 1
+
+        def done(result):
+            self.pending -= 1
+            if callback is not None and not self.closed:
+                callback(result)
+        return done
+
+    def copy(self, text):
+        self.worker.copy(text, self._track(None))
+
+    def paste(self, callback):
+        self.worker.paste(self._track(callback))
+
+    def poll(self):
+        self.worker.poll()
+
+    def close(self):
+        self.closed = True
+
+
+_clipboard_worker = None
+
+
+def get_clipboard_worker():  # 进程内共享的剪贴板线程（系统剪贴板本身是全局的）
+    global _clipboard_worker
+    if _clipboard_worker is None:
+        _clipboard_worker = ClipboardWorker()
+    return _clipboard_worker
@@ -1,14 +1,15 @@
 from .text_manager import TextManager
-import itertools
+from .wrap_index import WrapIndex
 import bisect
 
 
 class Cursor(TextManager):  # 带指针的文本管理器
-    def __init__(self, text: str, font):
-        super().__init__(text, font)
+    def __init__(self, text: str, font, storage='list', lazy=False):
+        super().__init__(text, font, storage, lazy)
         
         self.row, self.column = 0, 0  # 指针在文本框中的行、列位置
         self.x, self.y = 0, 0  # 指针在文本框中渲染时的位置
+        self.get_line_width(self.row)  # 光标所在行须已测量
 
     def get_cursor_text(self):  # 获取光标右边的一个字符
         return self.text[self.row][self.column]
@@ -24,9 +25,8 @@ class Cursor(TextManager):  # 带指针的文本管理器
 
     def set_cursor_pos(self, row, column):  # 设置光标在文本中坐标
         self.row, self.column = row, column  # 必须保证二者是合法的
-        current_text = self.text[self.row]
-        text_width = [self.font.rendered_text_width[char] for char in current_text]
-        self.x = sum(text_width[:column])
+        self.get_line_width(row)  # 保证该行已测量
+        self.x = self.font.get_prefix_width(self.text[self.row])[column]
         self.y = row * self.font.line_height
 
     def get_last_cursor_pos(self):  # 获取光标在文本末尾时的位置
@@ -34,7 +34,7 @@ class Cursor(TextManager):  # 带指针的文本管理器
 
     def set_last_cursor_pos(self):  # 光标移到文本末尾
         self.row, self.column = self.get_last_cursor_pos()
-        self.x = self.line_width[-1]
+        self.x = self.get_line_width(self.row)
         self.y = self.row * self.font.line_height
 
     def set_screen_pos(self, x, y):  # 设置光标在屏幕中坐标
@@ -49,10 +49,11 @@ class Cursor(TextManager):  # 带指针的文本管理器
         if line_index >= len(self.text):
             self.row, self.column = len(self.text) - 1, len(self.text[-1])
             self.y = (len(self.text) - 1) * self.font.line_height
-            self.x = self.line_width[self.row]
+            self.x = self.get_line_width(self.row)
             return
         if line_index < 0:
             self.row = self.column = self.x = self.y = 0
+            self.get_line_width(self.row)
             return
 
         # 设置光标行位置
@@ -61,25 +62,24 @@ class Cursor(TextManager):  # 带指针的文本管理器
 
         # 计算光标在该行的列位置
         current_text = self.text[self.row]
-        text_width = [self.font.rendered_text_width[char] for char in current_text]
-        text_width_acc = list(itertools.accumulate(text_width))
-        col = bisect.bisect_right(text_width_acc, relative_x)
+        self.get_line_width(self.row)  # 保证该行已测量
+        prefix_width = self.font.get_prefix_width(current_text)
+        col = bisect.bisect_right(prefix_width, relative_x, 1) - 1  # 光标所在的字符
 
-        if col >= len(text_width):
+        if col >= len(current_text):
             self.column = len(current_text)
-            self.x = self.line_width[line_index]
+            self.x = self.get_line_width(line_index)
         elif col < 0:
             self.column = self.x = 0
         else:
-            left = relative_x - (text_width_acc[col] - text_width[col])
-            right = text_width_acc[col] - relative_x
-            # print(left, right)
+            left = relative_x - prefix_width[col]
+            right = prefix_width[col + 1] - relative_x
             if left < right:
                 self.column = col
-                self.x = text_width_acc[col] - text_width[col]
+                self.x = prefix_width[col]
             else:
                 self.column = col + 1
-                self.x = text_width_acc[col]
+                self.x = prefix_width[col + 1]
 
     def is_first_line(self):  # 光标是否在第一行
         return self._is_first_line(self.row)
@@ -99,7 +99,7 @@ class Cursor(TextManager):  # 带指针的文本管理器
             self.y -= self.font.line_height
 
             self.column = len(self.text[self.row])  # 光标移到这一行末尾
-            self.x = self.line_width[self.row]
+            self.x = self.get_line_width(self.row)
 
         return self.row, self.column
 
@@ -110,6 +110,7 @@ class Cursor(TextManager):  # 带指针的文本管理器
 
             self.column = 0  # 光标移到这一行开头
             self.x = 0
+            self.get_line_width(self.row)  # 保证该行已测量
 
         return self.row, self.column
 
@@ -158,7 +159,7 @@ class Cursor(TextManager):  # 带指针的文本管理器
             return
 
         self.column = len(self.text[self.row - 1])
-        self.x = self.line_width[self.row - 1]
+        self.x = self.get_line_width(self.row - 1)
 
         self.y -= self.font.line_height
         self.row = self.remove_line_break_char(self.row)  # 删除换行符
@@ -182,3 +183,126 @@ class Cursor(TextManager):  # 带指针的文本管理器
 
         self.row += len(lines) - 1
         self.y += (len(lines) - 1) * self.font.line_height
+
+    def move_chars(self, count):  # 光标一次移动 count 个字符（负数向左）
+        self.set_cursor_pos(*self.offset_pos(self.row, self.column, count))
+
+    # 一次删除多个字符时逐行删除：行内的文字与换行符分别记录，撤销步骤与逐个删除时相同
+    def delete_chars(self, count):  # 一次删除光标左边的 count 个字符
+        if count == 1:
+            self.delete_char()
+            return
+        while count > 0 and not (self.is_line_start() and self.is_first_line()):
+            if self.is_line_start():
+                self.delete_char()  # 删除换行符
+                count -= 1
+                continue
+            length = min(count, self.column)
+            self.delete_string(self.row, self.column - length, self.column, True)
+            self.set_cursor_pos(self.row, self.column - length)
+            count -= length
+
+    def delete_chars_forward(self, count):  # 一次删除光标右边的 count 个字符
+        while count > 0 and not (self.is_line_end() and self.is_last_line()):
+            if self.is_line_end():
+                self.remove_line_break_char(self.row + 1)  # 删除换行符
+                count -= 1
+            else:
+                length = min(count, len(self.text[self.row]) - self.column)
+                self.delete_string(self.row, self.column, self.column + length, True)
+                count -= length
+        self.set_cursor_pos(self.row, self.column)
+
+
+class WrapCursor(Cursor):  # 软换行模式下的光标：屏幕坐标以视觉行为单位，x 为相对视觉行开头的位置
+    def __init__(self, text, font, storage='list', lazy=False, wrap_width=1):
+        super().__init__(text, font, storage, lazy)
+        self.wrap = WrapIndex(self, wrap_width)
+        self.sync_screen_pos()
+
+    def get_visual_pos(self, row, column):  # 文本坐标 -> (视觉行, 在视觉行中的 x)
+        breaks = self.wrap.get_breaks(row)
+        k = bisect.bisect_right(breaks, column)
+        start = breaks[k - 1] if k else 0
+        prefix_width = self.font.get_prefix_width(self.text[row])
+        return self.wrap.row_of_line(row) + k, prefix_width[column] - prefix_width[start]
+
+    def set_cursor_pos(self, row, column):
+        self.row, self.column = row, column
+        self.get_line_width(row)  # 保证该行已测量
+        visual_row, self.x = self.get_visual_pos(row, column)
+        self.y = visual_row * self.font.line_height
+
+    def sync_screen_pos(self):  # 文本或折行结果变化后，重新计算光标的屏幕坐标
+        self.set_cursor_pos(self.row, self.column)
+
+    def set_last_cursor_pos(self):
+        self.set_cursor_pos(*self.get_last_cursor_pos())
+
+    def set_screen_pos(self, x, y):
+        visual_row = y // self.font.line_height
+        if visual_row >= self.wrap.total:
+            self.set_last_cursor_pos()
+            return
+        if visual_row < 0:
+            self.set_cursor_pos(0, 0)
+            return
+
+        row, k = self.wrap.locate(visual_row)
+        self.get_line_width(row)
+        breaks = self.wrap.get_breaks(row)
+        k = min(k, len(breaks))  # 估算的视觉行数可能多于精确折行的结果
+        text = self.text[row]
+        start = breaks[k - 1] if k else 0
+        end = breaks[k] if k < len(breaks) else len(text)
+
+        prefix_width = self.font.get_prefix_width(text)
+        relative_x = x + prefix_width[start]
+        col = bisect.bisect_right(prefix_width, relative_x, start + 1, end + 1) - 1
+        if col < end and prefix_width[col + 1] - relative_x <= relative_x - prefix_width[col]:
+            col += 1
+        if k < len(breaks):  # 非最后一个视觉行的行尾属于下一个视觉行
+            col = min(col, end - 1)
+        self.set_cursor_pos(row, col)
+
+    def cursor_up(self):
+        if self.y > 0:
+            self.set_screen_pos(self.x, self.y - self.font.line_height)
+        return self.row, self.column
+
+    def cursor_down(self):
+        if self.y < (self.wrap.total - 1) * self.font.line_height:
+            self.set_screen_pos(self.x, self.y + self.font.line_height)
+        return self.row, self.column
+
+    def cursor_last_line(self):
+        super().cursor_last_line()
+        self.sync_screen_pos()
+        return self.row, self.column
+
+    def cursor_next_line(self):
+        super().cursor_next_line()
+        self.sync_screen_pos()
+        return self.row, self.column
+
+    def cursor_left(self):
+        super().cursor_left()
+        self.sync_screen_pos()
+        return self.row, self.column
+
+    def cursor_right(self):
+        super().cursor_right()
+        self.sync_screen_pos()
+        return self.row, self.column
+
+    def delete_char(self):
+        super().delete_char()
+        self.sync_screen_pos()
+
+    def add_string(self, string):
+        super().add_string(string)
+        self.sync_screen_pos()
+
+    def add_text(self, text):
+        super().add_text(text)
+        self.sync_screen_pos()
@@ -1,16 +1,24 @@
-import time
+from .frame_clock import FrameClock
 
 
 class CursorBlink:
-    def __init__(self):
+    def __init__(self, clock):
+        self.clock: FrameClock = clock
         self.blink_interval = 1.1
-        self.start_time = time.time()  # 当前闪烁时间周期的起始时间
+        self.start_time = clock.now  # 当前闪烁时间周期的起始时间
 
     @property
-    def get_blink(self):
+    def get_blink(self):  # 本帧光标是否显示
+        return self.get_blink_at(self.clock.now)
+
+    def get_blink_at(self, now):
         # 计算当前时间点在周期内的位置
-        time_in_cycle = (time.time() - self.start_time) % self.blink_interval
+        time_in_cycle = (now - self.start_time) % self.blink_interval
         return time_in_cycle < self.blink_interval / 2
 
+    def next_toggle(self, now):  # now 之后下一次光标显示/隐藏切换的时间
+        half = self.blink_interval / 2
+        return self.start_time + ((now - self.start_time) // half + 1) * half
+
     def create_new_cycle(self):
-        self.start_time = time.time()
+        self.start_time = self.clock.now
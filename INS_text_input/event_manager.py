@@ -1,7 +1,7 @@
 import pygame
 from .tool import Tool
 from .select_menu import SelectMenu
-from .keyboard import KeyBoard
+from .keyboard import KeyBoard, REPEATABLE_KEYS, HANDLED_KEYS
 from .shortcut import Shortcut
 
 
@@ -57,13 +57,51 @@ class EventManager:
             self.shortcut.handle_event(event)
             self.keyboard.handle_event(event)
 
+    def is_inert_key(self, event):  # 不会产生任何效果的按键事件（如输入字母时的 KEYDOWN）
+        if event.type == pygame.KEYUP:
+            return True
+        return event.type == pygame.KEYDOWN and not self.shortcut.is_shortcut(event) and \
+            (event.key not in HANDLED_KEYS or event.mod & pygame.KMOD_SHIFT)
+
+    def batch_events(self, events):  # 合并连续的文字输入和连续按下的按键，使每帧只对文本做一次修改
+        batched = []
+        text_index = key_index = None  # 可继续合并的 TEXTINPUT / KEYDOWN 事件在 batched 中的下标
+        for event in events:
+            if event.type == pygame.TEXTINPUT:
+                key_index = None
+                if text_index is not None:
+                    batched[text_index] = pygame.event.Event(pygame.TEXTINPUT, text=batched[text_index].text + event.text)
+                    continue
+                text_index = len(batched)
+            elif event.type == pygame.KEYDOWN and event.key in REPEATABLE_KEYS and \
+                    not event.mod & pygame.KMOD_SHIFT and not self.shortcut.is_shortcut(event):
+                text_index = None
+                if key_index is not None:
+                    last = batched[key_index]
+                    if last.key == event.key and last.mod == event.mod:
+                        batched[key_index] = pygame.event.Event(pygame.KEYDOWN, key=event.key, mod=event.mod,
+                                                                count=getattr(last, 'count', 1) + 1)
+                        continue
+                key_index = len(batched)
+            elif not self.is_inert_key(event):  # 其他事件打断合并；无效果的按键事件可以跳过
+                text_index = key_index = None
+            batched.append(event)
+        return batched
+
     def set_focus(self, mode):
         self.focus = mode
+        router = self.parent.router
+        if router is not None:  # 由分发器记录焦点，只需让之前拥有焦点的输入框失去焦点
+            if self.focus:
+                router.set_focus(self.parent)
+            elif router.focused is self.parent:
+                router.set_focus(None)
         if self.focus:
-            for text_input in self.parent.text_input_group:
-                if text_input == self.parent:
-                    continue
-                text_input.event.set_focus(False)
+            if router is None:
+                for text_input in self.parent.text_input_group:
+                    if text_input == self.parent:
+                        continue
+                    text_input.event.set_focus(False)
             pygame.key.start_text_input()
         else:
             self.select_menu.close_menu()
@@ -102,6 +140,8 @@ class EventManager:
         if not self.select_menu.is_menu_visible:
             self.tool.selected_event_update(mouse_pos)
 
+        if self.focus:
+            events = self.batch_events(events)
         for event in events:
             if self.focus and not self.select_menu.is_menu_visible:
                 self.handle_key_board(event)
@@ -0,0 +1,107 @@
+import pygame
+
+
+ROUTER_CELL_SIZE = 128  # 空间索引每个格子的边长（像素）
+
+# 只发给拥有焦点的输入框的事件
+KEYBOARD_EVENTS = frozenset((pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT, pygame.TEXTEDITING))
+
+
+class EventRouter:  # 事件分发器：鼠标事件按位置命中测试，键盘事件只发给拥有焦点的输入框
+    def __init__(self, cell_size=ROUTER_CELL_SIZE):
+        self.cell_size = cell_size
+        self.grid = {}  # 格子坐标 -> 与该格子相交的输入框列表（按加入顺序，后加入的在上层）
+        self.cells = {}  # 输入框 -> 它占用的格子以及登记时的位置
+        self.order = {}  # 输入框 -> 加入顺序
+        self.count = 0
+        self.focused = None  # 拥有焦点的输入框
+
+    def _cells_of(self, rect):
+        size = self.cell_size
+        return [(cx, cy) for cx in range(rect.left // size, (rect.right - 1) // size + 1)
+                for cy in range(rect.top // size, (rect.bottom - 1) // size + 1)]
+
+    def add(self, text_input):  # 登记输入框，之后由分发器统一分发事件
+        text_input.router = self
+        self.order[text_input] = self.count
+        self.count += 1
+        self.update(text_input)
+
+    def remove(self, text_input):
+        if text_input not in self.cells:
+            return
+        for cell in self.cells.pop(text_input)[0]:
+            inputs = self.grid[cell]
+            inputs.remove(text_input)
+            if not inputs:
+                del self.grid[cell]
+        del self.order[text_input]
+        if self.focused is text_input:
+            self.focused = None
+        text_input.router = None
+
+    def update(self, text_input):  # 输入框的位置或大小改变后须调用，重新登记到空间索引中
+        rect = text_input.rect
+        if text_input in self.cells:
+            if self.cells[text_input][1] == tuple(rect):
+                return
+            for cell in self.cells[text_input][0]:
+                self.grid[cell].remove(text_input)
+        cells = self._cells_of(rect)
+        for cell in cells:
+            inputs = self.grid.setdefault(cell, [])
+            inputs.append(text_input)
+            inputs.sort(key=self.order.__getitem__)
+        self.cells[text_input] = (cells, tuple(rect))
+
+    def hit_test(self, pos):  # 位于 pos 处最上层的输入框，没有时返回 None
+        size = self.cell_size
+        for text_input in reversed(self.grid.get((pos[0] // size, pos[1] // size), ())):
+            if text_input.rect.collidepoint(pos):
+                return text_input
+        return None
+
+    def set_focus(self, text_input):  # 焦点转移到 text_input 上（None 表示没有输入框拥有焦点）
+        if self.focused is not None and self.focused is not text_input:
+            self.focused.event.focus = False
+            self.focused.select_menu.close_menu()
+        self.focused = text_input
+
+    def needs_redraw(self, mouse_pos=None):  # 是否有输入框的画面需要重绘
+        return any(text_input.needs_redraw(mouse_pos) for text_input in self.order)
+
+    def next_wakeup(self):  # 所有输入框中最早的一次定时变化（帧时钟的时间戳），None 表示不会自动变化
+        wakeups = [wakeup for wakeup in (text_input.next_wakeup() for text_input in self.order) if wakeup is not None]
+        return min(wakeups, default=None)
+
+    def handle_events(self, events, mouse_pos):
+        # 每个输入框只收到与它有关的事件，代价与事件数量成正比，而与输入框数量无关
+        focused = self.focused
+        routed = {}
+        if focused is not None:
+            routed[focused] = []  # 拥有焦点的输入框每帧都要更新（拖动选择、滚动条等），且最先处理
+        for event in events:
+            if event.type in KEYBOARD_EVENTS:
+                if focused is not None:
+                    routed.setdefault(focused, []).append(event)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                target = self.hit_test(event.pos)
+                if event.button <= 3:  # 点击使焦点转移到被点击的输入框（点击空白处则没有输入框拥有焦点）
+                    if target is not None and target is not focused and target in routed:
+                        # 同一帧内焦点回到了之前的输入框，先处理已分发的事件以保证先后顺序
+                        self._dispatch(routed, mouse_pos)
+                        routed = {}
+                    if focused is not None and focused is not target:
+                        routed.setdefault(focused, []).append(event)  # 点击别处时失去焦点
+                    focused = target
+                if target is not None:
+                    routed.setdefault(target, []).append(event)
+            elif event.type in (pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION):
+                if focused is not None:
+                    routed.setdefault(focused, []).append(event)
+        self._dispatch(routed, mouse_pos)
+
+    @staticmethod
+    def _dispatch(routed, mouse_pos):
+        for text_input, input_events in routed.items():
+            text_input.handle_events(input_events, mouse_pos)
@@ -1,41 +1,342 @@
 import pygame
+import atexit
+import itertools
+import os
+import weakref
+import numpy as np
+from collections import deque
+from array import array
+from collections import OrderedDict
+from .glyph_atlas import GlyphAtlas
+
+
+PREFIX_WIDTH_CACHE_SIZE = 2048  # 最多缓存多少行的前缀宽度
+LINE_SURFACE_CACHE_BYTES = 16 * 1024 * 1024  # 整行画布缓存的内存上限（字节）
+LINE_SURFACE_MAX_WIDTH = 4096  # 超过此宽度的行不缓存整行画布，逐字绘制
+GLYPH_CACHE_BYTES = 8 * 1024 * 1024  # 字形缓存的默认内存上限（字节），None 表示不限制
+GLYPH_CACHE_ENTRIES = None  # 字形缓存的默认条目上限，None 表示不限制
+VECTORIZE_MIN_LENGTH = 64  # 文本长度达到此值时使用 NumPy 向量化计算宽度
+BMP_SIZE = 0x10000  # 基本多文种平面的码位数量
+GLYPH_RASTER_BUDGET = 64  # 每帧最多光栅化的新字形数，超出的字形先显示占位框，之后的帧再补上（None 表示不限制）
+PLACEHOLDER_ALPHA = 40  # 占位框的不透明度
+
+WARM_UP_ASCII = ''.join(map(chr, range(0x20, 0x7f)))  # 可打印的 ASCII 字符
+
+
+def get_metrics_path(font_path, font_size, cache_dir):  # 字符宽度缓存文件：以字体文件内容的摘要和字号为键
+    import hashlib  # 只有启用宽度缓存时才需要，不在导入时加载
+    digest = hashlib.blake2b(digest_size=16)
+    with open(font_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return os.path.join(cache_dir, '%s-%d.widths' % (digest.hexdigest(), font_size))
+
+
+def get_common_hanzi():  # 常用汉字：GB2312 一级汉字（3755 个，按拼音排序）
+    return bytes(b for hi in range(0xb0, 0xd8) for lo in range(0xa1, 0xff)
+                 for b in (hi, lo)).decode('gb2312', 'ignore')
 
 
 class FontRenderer:
-    def __init__(self, font, font_size, font_color, line_height):
+    def __init__(self, font, font_size, font_color, line_height, antialias=True,
+                 glyph_cache_bytes=GLYPH_CACHE_BYTES, glyph_cache_entries=GLYPH_CACHE_ENTRIES):
         self.font = font  # 字体
         self.font_size = font_size  # 字体大小
         self.font_color = font_color  # 字体颜色
         self.line_height = line_height  # 行高
+        self.antialias = antialias  # 是否抗锯齿
         self.offset_height = (self.line_height - self.font.size('j')[1]) // 2
         self.blank_surface = pygame.Surface((0, self.font.size('j')[1]), pygame.SRCALPHA).convert_alpha()
 
-        self.rendered_text_surface = {}  # 缓存已渲染的文字的画布
-        self.rendered_text_width = {}  # 缓存已渲染的文字的画布的宽度
+        self.atlas = GlyphAtlas()  # 字形图集，所有字形画布都打包在其中
+        # 缓存已渲染的文字：[图集页画布, 字形在图集页中的区域, 最近一次使用的帧]，按 LRU 淘汰
+        self.rendered_glyph = OrderedDict()
+        self.blank_glyph = [self.blank_surface, None, 0]  # 零宽字符
+        self.rendered_text_width = {}  # 缓存文字的宽度（开销很小，常驻内存）
+        # 基本多文种平面内字符的宽度表（以码位为下标），用于向量化计算行宽；其他字符只存于上面的字典
+        self.width_table = np.zeros(BMP_SIZE, np.int32)
+        self.width_measured = np.zeros(BMP_SIZE, np.bool_)
+        self.metrics_path = None  # 宽度表在磁盘上的缓存文件（None 表示不缓存）
+        self.metrics_saved = 0  # 缓存文件中已有的字符数
+
+        # 字形缓存的容量限制以及统计数据（一帧内用到的字形多于上限时暂时超出，下一帧开始时再淘汰）
+        self.glyph_cache_bytes = glyph_cache_bytes
+        self.glyph_cache_entries = glyph_cache_entries
+        self.glyph_bytes = 0
+        self.glyph_hits = self.glyph_misses = self.glyph_evictions = 0
+        self.frame = 0  # 当前帧序号，本帧使用过的字形不会被淘汰
+        # 光栅化预算：字符宽度总是立即测量（排版不受影响），字形画布则分摊到多帧中渲染
+        self.raster_budget = GLYPH_RASTER_BUDGET
+        self.raster_count = 0  # 本帧已光栅化的字形数
+        self.placeholder_count = 0  # 累计返回占位框的次数，变化说明有字形尚未光栅化
+        self.placeholder_glyphs = {}  # 宽度 -> 占位框字形
+        self.warm_up_queue = deque()  # 等待预先光栅化的字符
+        # 缓存每行文字的前缀宽度（第 i 项为前 i 个字符的总宽度），以行内容为键：
+        # 行被编辑后内容即发生变化，只有这一行需要重新计算
+        self.prefix_width_cache = OrderedDict()
+        # 缓存整行文字渲染后的画布（LRU，按内存占用淘汰），同样以行内容为键
+        self.line_surface_cache = OrderedDict()
+        self.line_surface_bytes = 0
+
+    def measure_char(self, char):  # 测量单个字符的宽度并缓存
+        width = self.rendered_text_width[char] = self.font.size(char)[0]
+        code = ord(char)
+        if code < BMP_SIZE:
+            self.width_table[code] = width
+            self.width_measured[code] = True
+        return width
+
+    def load_metrics(self, path):  # 从缓存文件载入宽度表，之后只需测量表中没有的字符；退出时保存新测量的字符
+        self.metrics_path = path
+        _metrics_renderers.add(self)
+        try:
+            widths = np.fromfile(path, np.int32)  # 文件即宽度数组本身（-1 表示未测量），无需解析
+        except (OSError, ValueError):
+            return False
+        if len(widths) != BMP_SIZE:
+            return False
+        codes = np.flatnonzero((widths >= 0) & ~self.width_measured)
+        self.width_table[codes] = widths[codes]
+        self.width_measured[codes] = True
+        self.rendered_text_width.update(zip(map(chr, codes.tolist()), widths[codes].tolist()))
+        self.metrics_saved = int(self.width_measured.sum())
+        return True
 
-    def pre_render_string(self, string):  # 预渲染单行文本，并存储进缓存，返回文本宽度
+    def save_metrics(self):  # 把宽度表写入缓存文件（没有新测量的字符时不写）
+        measured = int(self.width_measured.sum())
+        if self.metrics_path is None or measured == self.metrics_saved:
+            return
+        widths = np.where(self.width_measured, self.width_table, -1).astype(np.int32)
+        os.makedirs(os.path.dirname(self.metrics_path) or '.', exist_ok=True)
+        temp_path = '%s.%d.tmp' % (self.metrics_path, os.getpid())
+        widths.tofile(temp_path)
+        os.replace(temp_path, self.metrics_path)  # 原子替换，多个进程同时写入也不会损坏
+        self.metrics_saved = measured
+
+    @staticmethod
+    def get_codes(string):  # 文本的码位数组
+        return np.frombuffer(string.encode('utf-32-le', 'surrogatepass'), np.uint32)
+
+    def get_char_widths(self, codes):  # 向量化获取每个码位对应字符的宽度（NumPy 数组）
+        bmp = codes < BMP_SIZE
+        if bmp.all():
+            for code in np.unique(codes[~self.width_measured[codes]]).tolist():  # 首次出现的字符
+                self.measure_char(chr(code))
+            return self.width_table[codes]
+
+        bmp_codes = codes[bmp]
+        for code in np.unique(bmp_codes[~self.width_measured[bmp_codes]]).tolist():
+            self.measure_char(chr(code))
+        widths = np.zeros(len(codes), np.int32)
+        widths[bmp] = self.width_table[bmp_codes]
+        widths[~bmp] = [self.rendered_text_width.get(chr(code)) or self.measure_char(chr(code))
+                        for code in codes[~bmp].tolist()]  # 其他平面的字符较少，逐个查询字典
+        return widths
+
+    def pre_render_string(self, string):  # 测量单行文本中每个字符的宽度并缓存，返回文本宽度（字形在绘制时才光栅化）
+        if len(string) >= VECTORIZE_MIN_LENGTH:
+            return int(self.get_char_widths(self.get_codes(string)).sum())
         width = 0
         for char in string:
-            if char not in self.rendered_text_surface:
-                self.rendered_text_width[char] = self.font.size(char)[0]
-                if self.rendered_text_width[char]:
-                    self.rendered_text_surface[char] = self.font.render(char, True, self.font_color).convert_alpha()
-                else:  # 处理零宽字符
-                    self.rendered_text_surface[char] = self.blank_surface
+            if char not in self.rendered_text_width:
+                self.measure_char(char)
             width += self.rendered_text_width[char]
         return width
 
-    def pre_render_text(self, text, split=True):  # 预渲染多行文本，并存储进缓存，返回文本宽度
-        if split:
+    def pre_render_text(self, text, split=True):  # 预渲染多行文本，并存储进缓存，返回每行的文本宽度
+        if not split:
+            text = '\n'.join(text)
+        if len(text) < VECTORIZE_MIN_LENGTH:
             return list(map(self.pre_render_string, text.split('\n')))
-        return list(map(self.pre_render_string, text))
+
+        # 一次性计算整段文本每个字符的宽度，再按换行符位置分段求和
+        codes = self.get_codes(text)
+        widths = self.get_char_widths(codes)
+        line_breaks = np.flatnonzero(codes == 10)
+        widths[line_breaks] = 0
+        prefix_width = np.concatenate(([0], np.cumsum(widths, dtype=np.int64)))
+        line_start = np.concatenate(([0], line_breaks + 1))
+        line_end = np.concatenate((line_breaks, [len(widths)]))
+        return (prefix_width[line_end] - prefix_width[line_start]).tolist()
+
+    def measure_prefix_width(self, string):  # 计算单行文本的前缀宽度数组（不缓存，文本须已预渲染）
+        prefix_width = array('i', [0])
+        if len(string) >= VECTORIZE_MIN_LENGTH:
+            prefix_width.frombytes(np.cumsum(self.get_char_widths(self.get_codes(string)), dtype=np.int32).tobytes())
+        else:
+            prefix_width.extend(itertools.accumulate(map(self.rendered_text_width.__getitem__, string)))
+        return prefix_width
+
+    def get_prefix_width(self, string):  # 获取单行文本的前缀宽度数组（文本须已预渲染）
+        cache = self.prefix_width_cache
+        prefix_width = cache.get(string)
+        if prefix_width is not None:
+            cache.move_to_end(string)
+            return prefix_width
+
+        prefix_width = self.measure_prefix_width(string)
+        cache[string] = prefix_width
+        if len(cache) > PREFIX_WIDTH_CACHE_SIZE:
+            cache.popitem(last=False)
+        return prefix_width
+
+    def get_line_surface(self, string):  # 获取整行文本的画布，行过宽时返回 None（文本须已预渲染）
+        cache = self.line_surface_cache
+        line_surface = cache.get(string)
+        if line_surface is not None:
+            cache.move_to_end(string)
+            return line_surface
+
+        prefix_width = self.get_prefix_width(string)
+        if prefix_width[-1] > LINE_SURFACE_MAX_WIDTH:
+            return None
+        line_surface = pygame.Surface((prefix_width[-1], self.blank_surface.get_height()), pygame.SRCALPHA)
+        get_glyph = self.get_glyph
+        placeholder_count = self.placeholder_count
+        line_surface.blits(((glyph[0], (prefix_width[i], 0), glyph[1])
+                            for i, glyph in enumerate(map(get_glyph, string))), False)
+        line_surface = line_surface.convert_alpha()
+        if self.placeholder_count != placeholder_count:  # 含有占位框的画布不缓存
+            return line_surface
+
+        cache[string] = line_surface
+        self.line_surface_bytes += line_surface.get_width() * line_surface.get_height() * 4
+        while self.line_surface_bytes > LINE_SURFACE_CACHE_BYTES and len(cache) > 1:
+            _, old_surface = cache.popitem(last=False)
+            self.line_surface_bytes -= old_surface.get_width() * old_surface.get_height() * 4
+        return line_surface
+
+    def begin_frame(self):  # 每帧渲染开始时调用
+        self.frame += 1
+        self.raster_count = 0
+        self.evict_glyphs()  # 上一帧用到的字形此时已可淘汰，缓存在每帧开始时回到容量限制以内
+
+    def warm_up(self, chars):  # 预热：立即测量 chars 中字符的宽度，字形在之后的帧中利用剩余预算逐步光栅化
+        self.pre_render_string(chars)
+        self.warm_up_queue.extend(chars)
+
+    def rasterize_pending(self):  # 用本帧剩余的预算光栅化预热队列中的字符
+        queue = self.warm_up_queue
+        while queue and (self.raster_budget is None or self.raster_count < self.raster_budget):
+            char = queue.popleft()
+            if char not in self.rendered_glyph:
+                self.get_glyph(char)
+
+    def get_placeholder(self, width):  # 尚未光栅化的字形先显示为同样宽度的淡色方框
+        glyph = self.placeholder_glyphs.get(width)
+        if glyph is None:
+            height = self.blank_surface.get_height()
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            surface.fill((*self.font_color[:3], PLACEHOLDER_ALPHA), (1, height // 5, max(width - 2, 1), height * 3 // 5))
+            glyph = self.placeholder_glyphs[width] = [surface.convert_alpha(), None, 0]
+        return glyph
+
+    def get_glyph(self, char):  # 获取字形 [图集页画布, 区域, 帧序号]，未缓存时光栅化
+        glyph = self.rendered_glyph.get(char)
+        if glyph is not None:
+            self.glyph_hits += 1
+            self.rendered_glyph.move_to_end(char)
+            glyph[2] = self.frame
+            return glyph
+
+        if char not in self.rendered_text_width:
+            self.pre_render_string(char)
+        if not self.rendered_text_width[char]:  # 处理零宽字符
+            return self.blank_glyph
+        if self.raster_budget is not None and self.raster_count >= self.raster_budget:  # 本帧预算已用完
+            self.placeholder_count += 1
+            return self.get_placeholder(self.rendered_text_width[char])
+
+        self.raster_count += 1
+        self.glyph_misses += 1
+        surface, area = self.atlas.add(self.font.render(char, self.antialias, self.font_color))
+        glyph = self.rendered_glyph[char] = [surface, area, self.frame]
+        self.glyph_bytes += area.w * area.h * 4
+        self.evict_glyphs()
+        return glyph
+
+    def is_glyph_cache_full(self):
+        return (self.glyph_cache_bytes is not None and self.glyph_bytes > self.glyph_cache_bytes) or \
+            (self.glyph_cache_entries is not None and len(self.rendered_glyph) > self.glyph_cache_entries)
+
+    def evict_glyphs(self):  # 淘汰最久未使用的字形，直到缓存回到容量限制以内
+        cache = self.rendered_glyph
+        while cache and self.is_glyph_cache_full():
+            char = next(iter(cache))
+            surface, area, frame = cache[char]
+            if frame == self.frame:  # 本帧仍在使用的字形不能淘汰（可能还未绘制）
+                break
+            del cache[char]
+            self.atlas.remove(surface, area)
+            self.glyph_bytes -= area.w * area.h * 4
+            self.glyph_evictions += 1
+
+    def clear_cache(self):  # 释放所有已渲染的画布（字形、整行画布），字符宽度仍保留
+        self.rendered_glyph.clear()
+        self.placeholder_glyphs.clear()
+        self.warm_up_queue.clear()
+        self.atlas = GlyphAtlas()
+        self.glyph_bytes = 0
+        self.prefix_width_cache.clear()
+        self.line_surface_cache.clear()
+        self.line_surface_bytes = 0
+
+    def glyph_cache_stats(self):  # 字形缓存的统计数据
+        return {
+            'hits': self.glyph_hits,
+            'misses': self.glyph_misses,
+            'evictions': self.glyph_evictions,
+            'entries': len(self.rendered_glyph),
+            'bytes': self.glyph_bytes,
+        }
+
+    def get_glyph_surface(self, char):  # 获取单个字形的独立画布（图集页的子画布）
+        surface, area, _ = self.get_glyph(char)
+        return surface if area is None else surface.subsurface(area)
+
+    def atlas_occupancy(self):  # 字形图集的占用情况
+        return self.atlas.occupancy()
 
     def render_underline_text(self, text, pos):  # 绘制输入法候选框的文字（pos是光标位置）
         # 渲染文本
-        text_surface = self.font.render(text, True, self.font_color)
+        text_surface = self.font.render(text, self.antialias, self.font_color)
         text_rect = text_surface.get_rect()
 
         # 绘制下划线
         pygame.draw.line(text_surface, (0, ) * 3, (0, text_rect.bottom - 1), (text_rect.right, text_rect.bottom - 1))
 
         return text_surface, max(self.font.size(text[:pos])[0] - 1, 0)
+
+
+# 进程内共享的 FontRenderer，相同字体、字号、颜色、抗锯齿设置（以及行高）的输入框共用同一份字形缓存
+_font_renderer_registry = weakref.WeakValueDictionary()
+_metrics_renderers = weakref.WeakSet()  # 启用了宽度缓存的 FontRenderer，进程退出时保存
+
+
+@atexit.register
+def save_all_metrics():
+    for font_renderer in list(_metrics_renderers):
+        try:
+            font_renderer.save_metrics()
+        except OSError:
+            pass
+
+
+def get_font_renderer(font, font_size, font_color, line_height, antialias=True, metrics_cache_dir=None):
+    # font 可以是字体文件路径，也可以是 pygame.font.Font 对象；
+    # 传入路径时按文件识别字体，传入对象时按对象本身识别
+    if isinstance(font, (str, os.PathLike)):
+        font_key = ('file', os.path.abspath(os.fspath(font)), font_size)
+    else:
+        font_key = ('object', id(font), font_size)  # 共享的 FontRenderer 持有字体对象，存活期间 id 不会被复用
+    key = (font_key, tuple(font_color), antialias, line_height)
+
+    font_renderer = _font_renderer_registry.get(key)
+    if font_renderer is None:
+        if font_key[0] == 'file':
+            font = pygame.font.Font(font, font_size)
+        font_renderer = FontRenderer(font, font_size, font_color, line_height, antialias)
+        if font_key[0] == 'file' and metrics_cache_dir is not None:
+            font_renderer.load_metrics(get_metrics_path(font_key[1], font_size, metrics_cache_dir))
+        _font_renderer_registry[key] = font_renderer
+    return font_renderer
@@ -0,0 +1,18 @@
+import time
+
+
+class FrameClock:  # 帧时钟：每帧只读取一次系统时间，各组件共用这一时刻
+    def __init__(self, virtual=False, start=0.0):
+        self.virtual = virtual  # 虚拟模式：时间只由 advance 推进，可用于以固定步长快速运行基准测试
+        self.now = start if virtual else time.time()  # 本帧的时间
+
+    def time(self):  # 当前时间（不更新本帧的时间）
+        return self.now if self.virtual else time.time()
+
+    def tick(self):  # 每帧开始时调用一次，返回本帧的时间
+        self.now = self.time()
+        return self.now
+
+    def advance(self, seconds):  # 虚拟模式下把时间推进 seconds 秒
+        self.now += seconds
+        return self.now
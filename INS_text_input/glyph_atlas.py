@@ -0,0 +1,84 @@
+import pygame
+
+
+ATLAS_PAGE_SIZE = 512  # 每张图集页的边长（像素）
+
+
+class AtlasPage:  # 一张图集页，按"货架"方式从上到下、从左到右排布字形
+    def __init__(self, size):
+        self.surface = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        self.shelves = []  # 每个货架为 [y, 高度, 已使用的宽度]
+        self.next_y = 0  # 下一个货架的起始 y 坐标
+        self.used_pixels = 0
+
+    def allocate(self, w, h):  # 为 w*h 的字形分配位置，放不下时返回 None
+        page_w, page_h = self.surface.get_size()
+        for shelf in self.shelves:
+            if shelf[1] == h and shelf[2] + w <= page_w:
+                x = shelf[2]
+                shelf[2] += w
+                return pygame.Rect(x, shelf[0], w, h)
+        if self.next_y + h > page_h or w > page_w:
+            return None
+        self.shelves.append([self.next_y, h, w])
+        self.next_y += h
+        return pygame.Rect(0, self.next_y - h, w, h)
+
+
+class GlyphAtlas:  # 字形图集：把所有字形打包进少量大画布中
+    def __init__(self, page_size=ATLAS_PAGE_SIZE):
+        self.page_size = page_size
+        self.pages = []
+        self.page_of = {}  # 图集页画布 -> 图集页
+        self.free_slots = {}  # 高度 -> 被释放的空位 [(图集页, 区域)]，优先复用
+        self.glyph_count = 0
+
+    def _allocate_free_slot(self, w, h):
+        slots = self.free_slots.get(h)
+        if not slots:
+            return None, None
+        for i, (page, slot) in enumerate(slots):
+            if slot.w >= w:
+                if slot.w == w:
+                    slots.pop(i)
+                else:  # 空位比字形宽，剩余部分继续留作空位
+                    slots[i] = (page, pygame.Rect(slot.x + w, slot.y, slot.w - w, h))
+                return page, pygame.Rect(slot.x, slot.y, w, h)
+        return None, None
+
+    def add(self, glyph_surface):  # 把字形放入图集，返回 (图集页画布, 字形所在区域)
+        w, h = glyph_surface.get_size()
+        page, area = self._allocate_free_slot(w, h)
+        if area is not None:
+            page.surface.fill((0, 0, 0, 0), area)
+        else:
+            page = self.pages[-1] if self.pages else None
+            area = page.allocate(w, h) if page is not None else None
+            if area is None:
+                # 超大字形单独占用一页
+                page = AtlasPage((max(self.page_size, w), max(self.page_size, h)))
+                self.pages.append(page)
+                self.page_of[page.surface] = page
+                area = page.allocate(w, h)
+        page.surface.blit(glyph_surface, area)
+        page.used_pixels += w * h
+        self.glyph_count += 1
+        return page.surface, area
+
+    def remove(self, surface, area):  # 释放某个字形占用的区域，以便之后复用
+        page = self.page_of[surface]
+        page.used_pixels -= area.w * area.h
+        self.free_slots.setdefault(area.h, []).append((page, area))
+        self.glyph_count -= 1
+
+    def occupancy(self):  # 图集占用情况
+        total_pixels = sum(page.surface.get_width() * page.surface.get_height() for page in self.pages)
+        used_pixels = sum(page.used_pixels for page in self.pages)
+        return {
+            'pages': len(self.pages),
+            'glyphs': self.glyph_count,
+            'used_pixels': used_pixels,
+            'total_pixels': total_pixels,
+            'bytes': total_pixels * 4,
+            'ratio': used_pixels / total_pixels if total_pixels else 0.0,
+        }
@@ -2,78 +2,98 @@ import pygame
 from .tool import Tool
 
 
+# 按住不放时会连续触发、可以合并为一次操作的按键
+REPEATABLE_KEYS = frozenset((pygame.K_BACKSPACE, pygame.K_DELETE,
+                             pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN))
+HANDLED_KEYS = REPEATABLE_KEYS | {pygame.K_RETURN, pygame.K_KP_ENTER}  # 内置键盘事件处理的按键
+
+
 class KeyBoard:  # 内置键盘事件，不可更改
     def __init__(self, tool):
         self.tool: Tool = tool
         self.selected_manager = self.tool.selected_manager
         self.cursor = self.tool.cursor
 
-    def handle_key_backspace(self):  # 处理 backspace 键
+    def handle_key_backspace(self, count=1):  # 处理 backspace 键，count 为连续按下的次数
         if self.selected_manager.has_selection:
             self.tool.delete_selected_text()
-            return
-        self.cursor.delete_char()
+            count -= 1
+            if not count:
+                return
+        self.cursor.delete_chars(count)
         self.tool.move_cursor_in_rect()
 
-    def handle_key_delete(self):  # 处理 delete 键
+    def handle_key_delete(self, count=1):  # 处理 delete 键
         if self.selected_manager.has_selection:
             self.tool.delete_selected_text()
-            return
+            count -= 1
+            if not count:
+                return
         if self.cursor.is_last_line() and self.cursor.is_line_end():  # 在最后一行末尾
             return
-        self.handle_key_right()  # 光标右移
-        self.handle_key_backspace()  # 删除字符
+        if count > 1:
+            self.cursor.delete_chars_forward(count)
+        else:
+            self.handle_key_right()  # 光标右移
+            self.handle_key_backspace()  # 删除字符
         self.tool.move_cursor_in_rect()
 
-    def handle_key_left(self):
+    def handle_key_left(self, count=1):
         if self.selected_manager.has_selection:
             begin, end = self.selected_manager.begin.copy(), self.selected_manager.end.copy()
             self.selected_manager.stop_selected()
             if max(begin, end) == list(self.cursor.get_cursor_pos()):
                 self.cursor.set_cursor_pos(*min(begin, end))
-        else:
+            count -= 1
+        if count == 1:
             self.cursor.cursor_left()
+        elif count:
+            self.cursor.move_chars(-count)
         self.tool.move_cursor_in_rect()
 
-    def handle_key_right(self):
+    def handle_key_right(self, count=1):
         if self.selected_manager.has_selection:
             begin, end = self.selected_manager.begin.copy(), self.selected_manager.end.copy()
             self.selected_manager.stop_selected()
             if min(begin, end) == list(self.cursor.get_cursor_pos()):
                 self.cursor.set_cursor_pos(*max(begin, end))
-        else:
+            count -= 1
+        if count == 1:
             self.cursor.cursor_right()
+        elif count:
+            self.cursor.move_chars(count)
         self.tool.move_cursor_in_rect()
 
-    def handle_key_up(self):
+    def handle_key_up(self, count=1):
         if self.selected_manager.has_selection:
             begin, end = self.selected_manager.begin.copy(), self.selected_manager.end.copy()
             self.selected_manager.stop_selected()
             if max(begin, end) == list(self.cursor.get_cursor_pos()):
                 self.cursor.set_cursor_pos(*min(begin, end))
-                self.tool.move_cursor_in_rect()
-                return
-        self.cursor.cursor_up()
+                count -= 1
+        for _ in range(count):
+            self.cursor.cursor_up()
         self.tool.move_cursor_in_rect()
 
-    def handle_key_down(self):
+    def handle_key_down(self, count=1):
         if self.selected_manager.has_selection:
             begin, end = self.selected_manager.begin.copy(), self.selected_manager.end.copy()
             self.selected_manager.stop_selected()
             if min(begin, end) == list(self.cursor.get_cursor_pos()):
                 self.cursor.set_cursor_pos(*max(begin, end))
-                self.tool.move_cursor_in_rect()
-                return
-        self.cursor.cursor_down()
+                count -= 1
+        for _ in range(count):
+            self.cursor.cursor_down()
         self.tool.move_cursor_in_rect()
 
     def handle_event(self, event):
         if event.mod & pygame.KMOD_SHIFT:
             return
+        count = getattr(event, 'count', 1)  # 合并后的连续按键事件带有按下次数
         if event.key == pygame.K_BACKSPACE:
-            self.handle_key_backspace()
+            self.handle_key_backspace(count)
         elif event.key == pygame.K_DELETE:
-            self.handle_key_delete()
+            self.handle_key_delete(count)
         elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
             if self.selected_manager.has_selection:
                 self.tool.delete_selected_text()
@@ -81,10 +101,10 @@ class KeyBoard:  # 内置键盘事件，不可更改
                 self.cursor.add_line_break_char()
             self.tool.move_cursor_in_rect()
         elif event.key == pygame.K_LEFT:
-            self.handle_key_left()
+            self.handle_key_left(count)
         elif event.key == pygame.K_RIGHT:
-            self.handle_key_right()
+            self.handle_key_right(count)
         elif event.key == pygame.K_UP:
-            self.handle_key_up()
+            self.handle_key_up(count)
         elif event.key == pygame.K_DOWN:
-            self.handle_key_down()
+            self.handle_key_down(count)
@@ -1,10 +1,12 @@
 import pygame
 import itertools
 import bisect
+from array import array
 from .tool import Tool
 from .event_manager import EventManager
 from .util import surface_concatenate
 from .select_menu import SelectMenu
+from .wrap_index import WRAP_MARGIN
 
 
 SELECTED_COLOR = (0xb5, 0xd5, 0xff)
@@ -22,98 +24,299 @@ class Renderer:
         self.selected_manager = tool.selected_manager
         self.select_menu: SelectMenu = select_menu
 
+        # 脏矩形渲染：持久化的后台画布，以及上一帧的画面状态
+        self.back_buffer = None
+        self.scroll_offset = None
+        self.line_signature = {}  # 行号 -> 该行上一帧的状态
+        self.scroll_signature = None
+        self.menu_rect = None
+        self.cursor_visible = False
+        self.placeholder_rows = set()  # 本帧含有占位框（字形尚未光栅化）的行，下一帧须重绘
+
+    def release(self):  # 释放后台画布，下一次渲染时整体重绘
+        self.back_buffer = None
+        self.scroll_offset = None
+        self.line_signature.clear()
+        self.scroll_signature = None
+        self.menu_rect = None
+
     def get_ime_editing_surface(self):
         if self.event.is_ime_editing():
             return self.font.render_underline_text(self.event.ime_editing_text, self.event.ime_editing_pos)
         return pygame.Surface((0, self.font.font_size), pygame.SRCALPHA), 0
 
-    def render_cursor(self, surface, sx, sy, ime_editing_pos, line_index):
-        if line_index != self.cursor.row or not self.event.focus:
+    def is_cursor_row(self, visual_row, line_index):  # 光标是否位于该视觉行
+        if line_index != self.cursor.row:
+            return False
+        return self.cursor.wrap is None or visual_row * self.font.line_height == self.cursor.y
+
+    def render_cursor(self, surface, sx, sy, ime_editing_pos, cursor_here):
+        if not cursor_here or not self.event.focus:
             return
         # sx: 当前行起始 x 坐标    sy: 当前行起始 y 坐标  （均相对显示区域）
         offset_x, offset_y = self.cursor.get_screen_pos()
         cursor_x = sx + offset_x + ime_editing_pos
         if ime_editing_pos != 0:
             self.tool._move_cursor_in_rect(offset_x + ime_editing_pos, offset_y)
-        if self.cursor_blink.get_blink:
+        if self.cursor_visible:
             pygame.draw.line(surface, (0,) * 3, (cursor_x, sy), (cursor_x, sy + self.font.line_height - 1))
 
-    def render_img_editing(self, line_index, ime_editing, text_width, text_surface):  # 绘制输入法候选框文字
-        cursor_row, cursor_col = self.cursor.get_cursor_pos()
-        if line_index != cursor_row or not self.event.is_ime_editing():
-            return
-
+    def render_img_editing(self, cursor_col, ime_editing, text_width, text_surface):  # 绘制输入法候选框文字
+        # cursor_col: 光标相对于本视觉行开头的列
         if 0 <= cursor_col < len(text_width):
             text_width[cursor_col] += ime_editing.get_width()
-            text_surface[cursor_col] = surface_concatenate(ime_editing, text_surface[cursor_col])
+            glyph = self.font.get_glyph_surface(self.cursor.get_cursor_text())
+            text_surface[cursor_col] = (surface_concatenate(ime_editing, glyph), None)
         else:  # 该行为空或光标在该行末尾
             text_width.append(ime_editing.get_width())
-            text_surface.append(ime_editing)
-
-    @staticmethod
-    def get_col_x(col, text_width_acc):  # 获取某行中，光标在col时的x坐标
-        if col == 0:
-            return 0
-        return text_width_acc[col - 1]
+            text_surface.append((ime_editing, None))
 
     def draw_selected_rect(self, surface, sx, ex, y):
         if sx > ex:
             return
         pygame.draw.rect(surface, SELECTED_COLOR, (sx, y, ex-sx, self.font.line_height))
 
-    def render_selected(self, surface, sx, sy, text_width_acc, line_index):
+    def render_selected(self, surface, sx, sy, prefix_width, line_index, column):
+        # column: 本视觉行在逻辑行中的起始列
         if not self.selected_manager.line_is_selecting(line_index):
             return
         begin, end = self.selected_manager.begin, self.selected_manager.end
         begin, end = (begin, end) if begin <= end else (end, begin)
-        s_x = sx + self.get_col_x(begin[1], text_width_acc) if line_index == begin[0] else 0
-        e_x = sx + self.get_col_x(end[1], text_width_acc) if line_index == end[0] else surface.get_width()
+        length = len(prefix_width) - 1
+        s_x = e_x = None
+        if line_index == begin[0]:
+            if begin[1] - column > length:  # 选区从后面的视觉行开始
+                return
+            s_x = sx + prefix_width[max(begin[1] - column, 0)]
+        if line_index == end[0]:
+            if end[1] < column:  # 选区在前面的视觉行就已结束
+                return
+            if end[1] - column <= length:
+                e_x = sx + prefix_width[end[1] - column]
+        s_x = 0 if s_x is None else s_x
+        e_x = surface.get_width() if e_x is None else e_x
 
         self.draw_selected_rect(surface, s_x, e_x, sy)
 
-    def render_string(self, surface, text, x, y, line_index, ime_editing, ime_editing_pos):
+    def render_string(self, surface, row, x, y, cursor_here, ime_editing, ime_editing_pos):
+        # row: (逻辑行号, 本视觉行的起始列, 本视觉行的文本)    cursor_here: 光标是否位于本视觉行
+        line_index, column, text = row
         offset_height = self.font.offset_height  # 渲染时的偏移量
-        text_width = [self.font.rendered_text_width[char] for char in text]
-        text_surface = [self.font.rendered_text_surface[char] for char in text]
-
-        self.render_img_editing(line_index, ime_editing, text_width, text_surface)
-
-        text_width_acc = list(itertools.accumulate(text_width))
-        s_index = bisect.bisect_left(text_width_acc, -x)
-        e_index = min(bisect.bisect_left(text_width_acc, surface.get_width() - x, s_index) + 1, len(text_width_acc))
-
-        self.render_selected(surface, x, y, text_width_acc, line_index)
-
-        surface.blits((text_surface[i], (x + text_width_acc[i] - text_width[i], y + offset_height))
-                      for i in range(s_index, e_index))
-
-        self.render_cursor(surface, x, y, ime_editing_pos, line_index)
-
-    def render(self, screen, rect, mouse_pos):
-        cache_surface = pygame.Surface(rect.size, pygame.SRCALPHA)  # 缓存渲染结果的画布
-        
-        hidden_lines_num = self.vScroll.offset // self.font.line_height  # 被隐藏的行数
-        hidden_lines_height = hidden_lines_num * self.font.line_height  # 被隐藏的行的总高度
-        remain_lines_num = len(self.cursor.text) - hidden_lines_num  # 剩余的行数
-        
-        x, y = -self.hScroll.offset, -self.vScroll.offset + hidden_lines_height  # 文字在渲染区域内的左上角纵坐标（渲染起始纵坐标）
-        
-        show_lines_num = min((rect.h - y) // self.font.line_height + 1, remain_lines_num)  # 能被显示的行数
-        end_line_index = hidden_lines_num + show_lines_num
-        
-        ime_editing, ime_editing_pos = self.get_ime_editing_surface()
+        if cursor_here and self.event.is_ime_editing():  # 输入法所在行需要临时拼接候选文字
+            text_width = [self.font.rendered_text_width[char] for char in text]
+            text_surface = list(map(self.font.get_glyph, text))
+            self.render_img_editing(self.cursor.column - column, ime_editing, text_width, text_surface)
+            prefix_width = array('i', [0])
+            prefix_width.extend(itertools.accumulate(text_width))
+        else:  # 其余行直接使用缓存的前缀宽度，不产生额外的分配
+            text_surface = None
+            prefix_width = self.font.get_prefix_width(text)
+            line_surface = self.font.get_line_surface(text)
+            if line_surface is not None:  # 整行画布已缓存，一次 blit 即可
+                self.render_selected(surface, x, y, prefix_width, line_index, column)
+                surface.blit(line_surface, (x, y + offset_height))
+                self.render_cursor(surface, x, y, ime_editing_pos, cursor_here)
+                return
 
-        for i in range(hidden_lines_num, end_line_index):
-            self.render_string(cache_surface, self.cursor.text[i], x, y, i, ime_editing, ime_editing_pos)
-            y += self.font.line_height
+        s_index = bisect.bisect_left(prefix_width, -x, 1) - 1
+        e_index = min(bisect.bisect_left(prefix_width, surface.get_width() - x, s_index + 1), len(prefix_width) - 1)
 
-        max_width = max(self.cursor.max_line_width,
-                        self.cursor.get_line_width(self.cursor.row) + ime_editing.get_width())
+        self.render_selected(surface, x, y, prefix_width, line_index, column)
 
-        self.vScroll.update_content_length(len(self.cursor.text) * self.font.line_height)
+        if text_surface is None:
+            get_glyph = self.font.get_glyph
+            surface.blits((glyph[0], (x + prefix_width[i], y + offset_height), glyph[1])
+                          for i, glyph in zip(range(s_index, e_index), map(get_glyph, text[s_index: e_index])))
+        else:
+            surface.blits((text_surface[i][0], (x + prefix_width[i], y + offset_height), text_surface[i][1])
+                          for i in range(s_index, e_index))
+
+        self.render_cursor(surface, x, y, ime_editing_pos, cursor_here)
+
+    def get_line_signature(self, visual_row, row, selection):  # 决定某一视觉行画面的全部状态，状态不变则无需重绘
+        line_index, column, text = row
+        selected = None
+        if selection is not None and selection[0][0] <= line_index <= selection[1][0]:
+            begin, end = selection
+            selected = (begin[1] if line_index == begin[0] else -1, end[1] if line_index == end[0] else -1)
+        if not self.is_cursor_row(visual_row, line_index):
+            return text, column, selected
+        return (text, column, selected, self.cursor.x if self.cursor_visible else None,
+                self.event.ime_editing_text, self.event.ime_editing_pos)
+
+    def get_wrapped_rows(self, rect):  # 软换行模式：精确折行可见区域，返回第一个可见视觉行及各视觉行
+        wrap = self.cursor.wrap
+        line_height = self.font.line_height
+
+        # 以第一个可见视觉行为锚点：上方的行折行结果变化时同步调整滚动位置，画面不会跳动
+        self.vScroll.update_content_length(wrap.total * line_height)
+        offset = self.vScroll.content_offset
+        anchor = min(int(offset) // line_height, wrap.total - 1)
+        anchor_line, anchor_k = wrap.locate(anchor)
+        if wrap.set_width(rect.w - WRAP_MARGIN):  # 宽度变化时全部改为估算值，先折可见行，其余逐帧补充
+            anchor_k = 0
+        wrap.refine()
+        new_anchor = wrap.row_of_line(anchor_line) + min(anchor_k, len(wrap.get_breaks(anchor_line)))
+        self.vScroll.update_content_length(wrap.total * line_height)
+        if new_anchor != anchor:
+            self.vScroll.update_content_offset(offset + (new_anchor - anchor) * line_height)
+
+        first_row_index = self.vScroll.offset // line_height
+        row_count = (self.vScroll.offset + rect.h - 1) // line_height + 1 - first_row_index
+        rows = []
+        line_index, k = wrap.locate(first_row_index)
+        while len(rows) < row_count and line_index < len(self.cursor.text):
+            text = self.cursor.text[line_index]
+            breaks = wrap.get_breaks(line_index)  # 可见行总是精确折行
+            starts, ends = (0, *breaks), (*breaks, len(text))
+            for k in range(min(k, len(breaks)), len(starts)):
+                rows.append((line_index, starts[k], text[starts[k]: ends[k]]))
+                if len(rows) == row_count:
+                    break
+            line_index, k = line_index + 1, 0
+        self.vScroll.update_content_length(wrap.total * line_height)
+        self.cursor.sync_screen_pos()  # 折行结果可能发生了变化
+        return first_row_index, rows
+
+    @staticmethod
+    def get_scroll_signature(scroll):
+        return scroll.visible, tuple(scroll.scroll_rect), tuple(scroll.scroll_color)
+
+    @staticmethod
+    def merge_dirty_rects(dirty_rects):  # 合并上下相邻的脏矩形，减少重绘次数
+        merged = []
+        for dirty_rect in sorted(dirty_rects, key=lambda r: (r.x, r.w, r.y)):
+            last = merged[-1] if merged else None
+            if last is not None and last.x == dirty_rect.x and last.w == dirty_rect.w and \
+                    dirty_rect.top <= last.bottom:
+                merged[-1] = last.union(dirty_rect)
+            else:
+                merged.append(dirty_rect)
+        return merged
+
+    def scroll_back_buffer(self, dx, dy):  # 把后台画布平移 (-dx, -dy)，返回需要重绘的区域
+        w, h = self.back_buffer.get_size()
+        self.back_buffer.scroll(-dx, -dy)
+
+        dirty_rects = []
+        if dy > 0:  # 向下滚动，底部露出新的行
+            dirty_rects.append(pygame.Rect(0, h - dy, w, dy))
+        elif dy < 0:
+            dirty_rects.append(pygame.Rect(0, 0, w, -dy))
+        if dx > 0:
+            dirty_rects.append(pygame.Rect(w - dx, 0, dx, h))
+        elif dx < 0:
+            dirty_rects.append(pygame.Rect(0, 0, -dx, h))
+
+        # 滚动条也随画面一起被平移了，需要擦除平移后的位置，并在原位置重绘
+        if self.scroll_signature is not None:
+            for signature in self.scroll_signature:
+                dirty_rects.append(pygame.Rect(signature[1]).move(-dx, -dy))
+                dirty_rects.append(pygame.Rect(signature[1]))
+        return dirty_rects
+
+    def repaint(self, dirty_rect, first_line_index, rows, ime_editing, ime_editing_pos):  # 重绘后台画布的某个区域
+        line_height = self.font.line_height
+        x, y = -self.scroll_offset[0], -self.scroll_offset[1]
+        surface = self.back_buffer
+        surface.set_clip(dirty_rect)
+        surface.fill((0, 0, 0, 0))
+        top = max((dirty_rect.top - y) // line_height, first_line_index)
+        bottom = min((dirty_rect.bottom - 1 - y) // line_height + 1, first_line_index + len(rows))
+        for i in range(top, bottom):
+            row = rows[i - first_line_index]
+            placeholder_count = self.font.placeholder_count
+            self.render_string(surface, row, x, y + i * line_height, self.is_cursor_row(i, row[0]),
+                               ime_editing, ime_editing_pos)
+            if self.font.placeholder_count != placeholder_count:
+                self.placeholder_rows.add(i)
+        self.vScroll.render(surface)
+        self.hScroll.render(surface)
+        surface.set_clip(None)
+
+    def render(self, screen, rect, mouse_pos):  # 返回本帧屏幕上发生变化的区域，可用于 pygame.display.update(rects)
+        line_height = self.font.line_height
+        ime_editing, ime_editing_pos = self.get_ime_editing_surface()
+        self.cursor_visible = self.event.focus and self.cursor_blink.get_blink
+        self.font.begin_frame()
+
+        if self.cursor.wrap is not None:
+            first_line_index, rows = self.get_wrapped_rows(rect)
+            max_width = 0  # 软换行模式下不需要水平滚动
+        else:
+            self.vScroll.update_content_length(len(self.cursor.text) * line_height)
+            first_line_index = self.vScroll.offset // line_height  # 第一个可见行
+            end_line_index = min((self.vScroll.offset + rect.h - 1) // line_height + 1, len(self.cursor.text))
+
+            # 可见行必须已测量；其余行每帧补测一部分，逐步修正水平滚动范围
+            for i in range(first_line_index, end_line_index):
+                self.cursor.get_line_width(i)
+            self.cursor.refine_line_width()
+            max_width = max(self.cursor.max_line_width,
+                            self.cursor.get_line_width(self.cursor.row) + ime_editing.get_width())
+            rows = [(i, 0, self.cursor.text[i]) for i in range(first_line_index, end_line_index)]
         self.hScroll.update_content_length(max_width+1)
-        self.vScroll.render(cache_surface)
-        self.hScroll.render(cache_surface)
-        screen.blit(cache_surface, rect)
 
+        # 后台画布尺寸变化时整体重绘；仅滚动时平移上一帧的画面，只重绘新露出的区域
+        scroll_offset = (self.hScroll.offset, self.vScroll.offset)
+        full_repaint = self.back_buffer is None or self.back_buffer.get_size() != rect.size
+        scrolled = scroll_offset != self.scroll_offset
+        dirty_rects = []
+        if full_repaint:
+            self.back_buffer = pygame.Surface(rect.size, pygame.SRCALPHA)
+        elif scrolled:
+            dx, dy = scroll_offset[0] - self.scroll_offset[0], scroll_offset[1] - self.scroll_offset[1]
+            if abs(dx) < rect.w and abs(dy) < rect.h:
+                dirty_rects = self.scroll_back_buffer(dx, dy)
+            else:
+                full_repaint = True
+        self.scroll_offset = scroll_offset
+
+        # 对比每一行的状态，找出需要重绘的行
+        selection = None
+        if self.selected_manager.has_selection:
+            begin, end = self.selected_manager.begin, self.selected_manager.end
+            selection = (begin, end) if begin <= end else (end, begin)
+        line_signature = {}
+        for i, row in enumerate(rows, first_line_index):
+            line_signature[i] = signature = self.get_line_signature(i, row, selection)
+            if full_repaint or self.line_signature.get(i) != signature:
+                dirty_rects.append(pygame.Rect(0, i * line_height - self.vScroll.offset, rect.w, line_height))
+        if not full_repaint:
+            for i in self.line_signature.keys() - line_signature.keys():  # 上一帧可见、本帧已不存在的行
+                dirty_rects.append(pygame.Rect(0, i * line_height - self.vScroll.offset, rect.w, line_height))
+        self.line_signature = line_signature
+
+        # 滚动条的位置或颜色发生变化时，重绘新旧两个位置
+        scroll_signature = (self.get_scroll_signature(self.vScroll), self.get_scroll_signature(self.hScroll))
+        if full_repaint:
+            dirty_rects = [self.back_buffer.get_rect()]
+        elif scroll_signature != self.scroll_signature:
+            for old_signature, new_signature in zip(self.scroll_signature, scroll_signature):
+                if old_signature != new_signature:
+                    dirty_rects.append(pygame.Rect(old_signature[1]))
+                    dirty_rects.append(pygame.Rect(new_signature[1]))
+        self.scroll_signature = scroll_signature
+
+        dirty_rects = [r.clip(self.back_buffer.get_rect()) for r in self.merge_dirty_rects(dirty_rects)]
+        dirty_rects = [r for r in dirty_rects if r.w and r.h]
+        self.placeholder_rows.clear()
+        for dirty_rect in dirty_rects:
+            self.repaint(dirty_rect, first_line_index, rows, ime_editing, ime_editing_pos)
+        for i in self.placeholder_rows:  # 清除这些行的状态，下一帧字形光栅化后重绘
+            self.line_signature.pop(i, None)
+        self.font.rasterize_pending()
+        screen.blit(self.back_buffer, rect)
+        if scrolled:  # 滚动后整个区域的像素都发生了移动
+            dirty_rects = [self.back_buffer.get_rect()]
+        dirty_rects = [r.move(rect.topleft) for r in dirty_rects]
+
+        # 右键菜单直接绘制在屏幕上，可见期间每帧都视为变化
+        menu_rect = None
+        if self.select_menu.alpha:  # 菜单画布（含阴影）比菜单大 2 像素，从菜单左上角开始绘制
+            menu_rect = self.select_menu.rect
+            menu_rect.size = (menu_rect.w + 2, menu_rect.h + 2)
+        dirty_rects.extend(r for r in (self.menu_rect, menu_rect) if r is not None)
+        self.menu_rect = menu_rect
         self.select_menu.render(screen, mouse_pos)
+        return dirty_rects
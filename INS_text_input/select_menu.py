@@ -1,10 +1,12 @@
 from .selected_manager import SelectedManager
 from INS_Animation import transition
 from .util import draw_shadow
+from .frame_clock import FrameClock
 import pygame
-pygame.font.init()
 
-font = pygame.font.Font('CHSansSC.ttf', 14)
+
+MENU_FONT_PATH, MENU_FONT_SIZE = 'CHSansSC.ttf', 14
+font = None  # 菜单字体，第一次绘制菜单时才加载
 
 normal_font_color = (26, 26, 26)
 hover_font_color = (255, 255, 255)
@@ -21,13 +23,25 @@ button_margin_left = 4
 button_margin_vertical = 5
 
 
+def get_menu_font():
+    global font
+    if font is None:
+        pygame.font.init()
+        font = pygame.font.Font(MENU_FONT_PATH, MENU_FONT_SIZE)
+    return font
+
+
 class Button:
     def __init__(self, text, func):
-        self.normal_text = font.render(text, True, normal_font_color)
-        self.hover_text = font.render(text, True, hover_font_color)
+        self.text = text
+        self.normal_text = self.hover_text = None  # 按钮文字在第一次绘制时才渲染
         self.func = func
 
     def render(self, screen, x, y, mouse_pos):
+        if self.normal_text is None:
+            menu_font = get_menu_font()
+            self.normal_text = menu_font.render(self.text, True, normal_font_color)
+            self.hover_text = menu_font.render(self.text, True, hover_font_color)
         rect = pygame.Rect(x, y, button_w, button_h)
 
         if rect.collidepoint(mouse_pos):
@@ -46,7 +60,8 @@ class Button:
 
 
 class SelectMenu:
-    def __init__(self, selected_manager, parent_rect):
+    def __init__(self, selected_manager, parent_rect, clock):
+        self.clock: FrameClock = clock  # 帧时钟，菜单动画使用本帧的时间
         self.is_menu_visible = False
         self.x, self.y = 0, 0
         self.alpha = 0
@@ -110,16 +125,18 @@ class SelectMenu:
             self.buttons = self.normal_menu_button
 
         if self.invisible_transition.play or not self.visible_transition.play:
-            self.visible_transition.start()
+            self.visible_transition.start(self.clock.now)
             self.invisible_transition.stop()
 
     def update(self):
-        self.visible_transition.update()
-        self.invisible_transition.update()
+        self.visible_transition.update(self.clock.now)
+        self.invisible_transition.update(self.clock.now)
 
     def close_menu(self):
         self.is_menu_visible = False
+        if self.alpha == 0 and not self.visible_transition.play:  # 菜单本就不可见，无需播放淡出动画
+            return
 
         if not self.invisible_transition.play or self.visible_transition.play:
             self.visible_transition.stop()
-            self.invisible_transition.start()
+            self.invisible_transition.start(self.clock.now)
@@ -1,5 +1,4 @@
 import pygame
-import time
 
 
 class SelectedManager:
@@ -10,7 +9,7 @@ class SelectedManager:
         self.begin = [0, 0]
         self.end = [0, 0]
 
-        self.last_update = time.time()
+        self.last_update = 0.0  # 上一次拖动选择更新的时间（帧时钟）
 
     def set_begin(self, pos):
         self.begin[0], self.begin[1] = pos[0], pos[1]
@@ -1,6 +1,6 @@
 from .tool import Tool
 from .select_menu import SelectMenu
-from .clipboard import ClipBoard
+from .clipboard import ClipboardClient, get_clipboard_worker
 from .util import mod_equal
 import pygame
 
@@ -11,6 +11,7 @@ class Shortcut:
         self.selected_manager = self.tool.selected_manager
         self.cursor = self.tool.cursor
         self.select_menu: SelectMenu = select_menu
+        self.clipboard = ClipboardClient(get_clipboard_worker())  # 剪贴板在共享的后台线程中读写
 
         self.shortcut = []
 
@@ -34,6 +35,16 @@ class Shortcut:
                           visible_in_normal_menu=False,
                           visible_in_select_menu=True)
 
+        self.add_shortcut(key=pygame.K_z, mod=pygame.KMOD_CTRL,
+                          name='撤销', func=self.handle_undo,
+                          visible_in_normal_menu=False,
+                          visible_in_select_menu=False)
+
+        self.add_shortcut(key=pygame.K_y, mod=pygame.KMOD_CTRL,
+                          name='重做', func=self.handle_redo,
+                          visible_in_normal_menu=False,
+                          visible_in_select_menu=False)
+
         self.add_shortcut(key=pygame.K_LEFT, mod=pygame.KMOD_SHIFT,
                           name='shift键+左键', func=self.shift_left,
                           visible_in_normal_menu=False,
@@ -71,19 +82,23 @@ class Shortcut:
         if not self.selected_manager.has_selection:
             return
         begin, end = self.selected_manager.begin.copy(), self.selected_manager.end.copy()
-        text = self.cursor.get_text(begin, end)
-        ClipBoard.copy(text)
+        # 只在此处复制各行的引用，整段文字在后台线程中拼接
+        self.clipboard.copy(self.cursor.get_text_lines(begin, end))
+        self.select_menu.close_menu()
+
+    def handle_paste(self):  # 粘贴（读到剪贴板内容后才插入文字）
+        self.clipboard.paste(self.apply_paste)
         self.select_menu.close_menu()
 
-    def handle_paste(self):  # 粘贴
+    def apply_paste(self, text):  # 插入从剪贴板读到的文字
         if self.selected_manager.has_selection:
             self.tool.delete_selected_text()
-        text = ClipBoard.paste()
         if not self.tool.multi_lines:
-            text.replace('\n', ' ')
+            text = text.replace('\n', ' ')
+        self.cursor.break_undo_group()  # 粘贴单独作为一步撤销
         self.cursor.add_text(text)
+        self.cursor.break_undo_group()
         self.tool.move_cursor_in_rect()
-        self.select_menu.close_menu()
 
     def handle_select_all(self):  # 全选
         self.selected_manager.set_begin((0, 0))
@@ -98,6 +113,14 @@ class Shortcut:
         self.tool.move_cursor_in_rect()
         self.select_menu.close_menu()
 
+    def handle_undo(self):  # 撤销
+        self.tool.undo()
+        self.select_menu.close_menu()
+
+    def handle_redo(self):  # 重做
+        self.tool.redo()
+        self.select_menu.close_menu()
+
     def shift_left(self):
         if not self.selected_manager.has_selection:
             self.selected_manager.set_begin(self.cursor.get_cursor_pos())
@@ -126,6 +149,12 @@ class Shortcut:
         self.selected_manager.set_end(self.cursor.get_cursor_pos())
         self.tool.move_cursor_in_rect()
 
+    def is_shortcut(self, event):  # 按键事件是否会触发快捷键
+        for shortcut in self.shortcut:
+            if mod_equal(event.mod, shortcut['mod']) and event.key == shortcut['key']:
+                return True
+        return False
+
     def handle_event(self, event):
         for shortcut in self.shortcut:
             if mod_equal(event.mod, shortcut['mod']) and event.key == shortcut['key']:
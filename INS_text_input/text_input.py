@@ -1,39 +1,76 @@
+import collections
+import weakref
 import pygame
 import pygame.locals
 import pygame.key
 from .scroll_bar import VScrollBar, HScrollBar
-from .font_renderer import FontRenderer
+from .font_renderer import FontRenderer, get_font_renderer, get_metrics_path
+from .text_storage import MappedLines
 from .event_manager import EventManager
 from .renderer import Renderer
-from .cursor import Cursor
+from .cursor import Cursor, WrapCursor
 from .selected_manager import SelectedManager
 from .select_menu import SelectMenu
 from .tool import Tool
 from .keyboard import KeyBoard
 from .shortcut import Shortcut
 from .cursor_blink import CursorBlink
+from .frame_clock import FrameClock
+from .wrap_index import WRAP_MARGIN
+from .undo_journal import UndoJournal, UNDO_JOURNAL_BYTES
 
 
 class TextInput:
-    text_input_group = []
+    text_input_group = weakref.WeakSet()  # 弱引用，输入框被丢弃后自动移除
 
-    def __init__(self, screen_rect, font, font_size, font_color, line_height, rect, init_text, multi_lines=True) -> None:
+    def __init__(self, screen_rect, font, font_size, font_color, line_height, rect, init_text, multi_lines=True,
+                 storage='list', antialias=True, share_font=True, lazy=False, max_lines=None, follow_tail=False,
+                 wrap=False, undo_bytes=UNDO_JOURNAL_BYTES, clock=None, warm_up=None,
+                 metrics_cache_dir=None) -> None:
         # 是否是多行文本框
         self.multi_lines = multi_lines
-        if not self.multi_lines:
+        if not self.multi_lines and isinstance(init_text, str):
             init_text = init_text.replace('\n', ' ')
 
-        # 字体
-        self.font = FontRenderer(font, font_size, font_color, line_height)
+        # 字体（font 可以是字体文件路径或 pygame.font.Font 对象）
+        # share_font 为 True 时，与其他相同字体设置的输入框共享字形缓存
+        # metrics_cache_dir: 字符宽度的磁盘缓存目录（仅 font 为字体文件路径时有效），重启后无需重新测量
+        self.share_font = share_font
+        if share_font:
+            self.font = get_font_renderer(font, font_size, font_color, line_height, antialias, metrics_cache_dir)
+        else:
+            font_path = None if isinstance(font, pygame.font.Font) else font
+            if font_path is not None:
+                font = pygame.font.Font(font_path, font_size)
+            self.font = FontRenderer(font, font_size, font_color, line_height, antialias)
+            if font_path is not None and metrics_cache_dir is not None:
+                self.font.load_metrics(get_metrics_path(font_path, font_size, metrics_cache_dir))
+        # 预热的字符集（如 WARM_UP_ASCII + get_common_hanzi()），字形在之后的帧中逐步光栅化
+        if warm_up:
+            self.font.warm_up(warm_up)
 
         # 位置
         self.rect: pygame.Rect = rect  # 输入框的 Rect
 
+        # 帧时钟：所有与时间有关的组件都使用它在本帧读取的时间
+        # 传入 clock 时由调用者每帧调用 clock.tick()（或虚拟模式下的 clock.advance()），可供多个输入框共用
+        self.own_clock = clock is None
+        self.clock = FrameClock() if clock is None else clock
+        self.clock_ticked = False  # 本帧是否已经读取过时间
+
         # 光标以及文字存储
-        self.cursor = Cursor(init_text, self.font)
-        self.cursor_blink = CursorBlink()  # 光标闪动
+        # storage: 文本存储引擎，大文档可使用 'rope'；lazy: 行宽在首次可见时才测量，打开大文档无需等待
+        # wrap: 软换行模式，超出文本框宽度的行自动折到下一视觉行，不再水平滚动
+        if wrap and self.multi_lines:
+            self.cursor = WrapCursor(init_text, self.font, storage, lazy, self.rect.w - WRAP_MARGIN)
+        else:
+            self.cursor = Cursor(init_text, self.font, storage, lazy)
+        # 撤销/重做记录，undo_bytes 为其占用内存的上限（None 表示不记录）
+        if undo_bytes is not None:
+            self.cursor.journal = UndoJournal(self.cursor, undo_bytes)
+        self.cursor_blink = CursorBlink(self.clock)  # 光标闪动
         self.selected_manager = SelectedManager(self.rect)
-        self.select_menu = SelectMenu(self.selected_manager, screen_rect)
+        self.select_menu = SelectMenu(self.selected_manager, screen_rect, self.clock)
 
         # 滚动条
         self.vScroll = VScrollBar(self.rect)
@@ -42,7 +79,7 @@ class TextInput:
         # 基本功能的封装
         self.tool = Tool(self.rect, self.vScroll, self.hScroll,
                          self.font, self.cursor, self.selected_manager,
-                         self.cursor_blink, self.multi_lines)
+                         self.cursor_blink, self.multi_lines, self.clock)
 
         # 内置键盘事件
         self.keyboard = KeyBoard(self.tool)
@@ -55,18 +92,130 @@ class TextInput:
         # 渲染
         self.render = Renderer(self.tool, self.event, self.select_menu)
 
-        self.text_input_group.append(self)
-
-    def display(self, screen, mouse_pos):
+        # 日志模式：其他线程通过 append_text 追加文字，每帧在 handle_events 中统一写入
+        self.append_queue = collections.deque()  # deque 的 append/popleft 是线程安全的
+        self.max_lines = max_lines  # 最大行数，超出后成批丢弃最早的行（None 为不限制）
+        self.follow_tail = follow_tail  # 滚动到底部时保持跟随新追加的内容
+
+        self.router = None  # 登记到 EventRouter 后，由分发器统一分发事件并记录焦点
+        self.drawn_state = None  # 上一次 display() 时的画面状态
+        self.closed = False
+        self.text_input_group.add(self)
+
+    @classmethod
+    def from_file(cls, path, screen_rect, font, font_size, font_color, line_height, rect, encoding='utf-8', **kwargs):
+        # 以内存映射方式打开文件：只解码渲染或光标用到的行，编辑写入叠加层，行宽按需测量
+        kwargs.setdefault('lazy', True)
+        return cls(screen_rect, font, font_size, font_color, line_height, rect, MappedLines(path, encoding), **kwargs)
+
+    def close(self):  # 释放输入框占用的资源（画布缓存、映射的文件等），之后不能再使用
+        if self.closed:
+            return
+        self.closed = True
+        if self.event.focus:
+            self.event.set_focus(False)
+        if self.router is not None:
+            self.router.remove(self)
+        self.text_input_group.discard(self)
+        self.render.release()
+        if self.font.metrics_path is not None:
+            try:
+                self.font.save_metrics()
+            except OSError:  # 缓存目录不可写时放弃缓存
+                pass
+        if not self.share_font:  # 共享的字形缓存在所有使用者都被回收后自动释放
+            self.font.clear_cache()
+        if self.cursor.journal is not None:
+            self.cursor.journal.clear()
+        self.append_queue.clear()
+        self.shortcut.clipboard.close()  # 尚未完成的粘贴不再写入已关闭的输入框
+        if isinstance(self.cursor.text, MappedLines):
+            self.cursor.text.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def tick_clock(self):  # 每帧只读取一次时间（handle_events 与 display 共用）
+        if self.own_clock and not self.clock_ticked:
+            self.clock.tick()
+            self.clock_ticked = True
+
+    def display(self, screen, mouse_pos):  # 返回屏幕上发生变化的矩形列表
+        self.tick_clock()
+        self.clock_ticked = False
+        self.shortcut.clipboard.poll()  # 后台读取的剪贴板内容在渲染线程中插入
+        self.flush_appended_text()  # 使用 EventRouter 时，没有事件的输入框不会调用 handle_events
         self.select_menu.update()
-        self.render.render(screen, self.rect, mouse_pos)
+        dirty_rects = self.render.render(screen, self.rect, mouse_pos)
+        self.drawn_state = self.get_visual_state(mouse_pos, self.clock.now)
+        return dirty_rects
+
+    def get_visual_state(self, mouse_pos, now):  # 决定画面内容的全部状态
+        return (self.cursor.version, self.cursor.get_cursor_pos(), self.cursor.get_screen_pos(),
+                self.vScroll.content_offset, self.hScroll.content_offset,
+                self.vScroll.scroll_color, self.hScroll.scroll_color,
+                tuple(self.selected_manager.begin), tuple(self.selected_manager.end),
+                self.event.focus and self.cursor_blink.get_blink_at(now),
+                self.event.ime_editing_text, self.event.ime_editing_pos,
+                self.select_menu.is_menu_visible, self.select_menu.alpha,
+                mouse_pos if self.select_menu.alpha else None,  # 菜单可见时，鼠标悬停的按钮会高亮
+                tuple(self.rect))
+
+    def is_animating(self):  # 是否有动画或需要逐帧推进的工作（补测行宽、折行、写入追加的文字）
+        wrap = self.cursor.wrap
+        return bool(self.append_queue or self.cursor.unmeasured or (wrap is not None and wrap.pending) or
+                    self.shortcut.clipboard.pending or self.render.placeholder_rows or self.font.warm_up_queue or
+                    self.select_menu.visible_transition.play or self.select_menu.invisible_transition.play)
+
+    def needs_redraw(self, mouse_pos=None):  # 自上一次 display() 以来，画面是否可能发生了变化
+        if mouse_pos is None:
+            mouse_pos = pygame.mouse.get_pos()
+        return self.is_animating() or self.selected_manager.is_selecting or \
+            self.get_visual_state(mouse_pos, self.clock.time()) != self.drawn_state
+
+    def next_wakeup(self):  # 下一次画面将自动变化的时间（帧时钟的时间戳），None 表示不会自动变化
+        if self.is_animating():
+            return self.clock.time()
+        if self.selected_manager.is_selecting:  # 拖动选择时，按固定频率向鼠标方向滚动
+            return self.selected_manager.last_update + 1 / 45
+        if self.event.focus:
+            return self.cursor_blink.next_toggle(self.clock.time())
+        return None
 
     def debug(self):
+        self.cursor.refine_line_width(None)
         width = [self.font.pre_render_string(string) for string in self.cursor.text]
-        assert self.cursor.line_width == width
+        assert list(self.cursor.line_width) == width
         assert self.cursor.max_line_width == max(width)
 
+    def append_text(self, text):  # 在文本末尾追加文字，可在任意线程调用
+        self.append_queue.append(text)
+
+    def flush_appended_text(self):  # 把队列中的文字写入文本（仅在渲染线程调用）
+        if not self.append_queue:
+            return
+        chunks = []
+        while self.append_queue:
+            chunks.append(self.append_queue.popleft())
+        text = ''.join(chunks)
+        if not self.multi_lines:
+            text = text.replace('\n', ' ')
+
+        follow = self.follow_tail and self.tool.is_scrolled_to_bottom()
+        self.cursor.append_text(text)
+        # 超出上限一定比例后才成批删除，使每行的删除代价均摊为 O(1)
+        if self.max_lines is not None and len(self.cursor.text) > self.max_lines + self.max_lines // 4:
+            self.tool.trim_lines(len(self.cursor.text) - self.max_lines)
+        if follow:
+            self.tool.scroll_to_bottom()
+
     def handle_events(self, events, mouse_pos):
+        self.tick_clock()
+        self.shortcut.clipboard.poll()
+        self.flush_appended_text()
         cx, cy = self.cursor.get_screen_pos()
         tx = self.rect.x - self.hScroll.offset + cx
         ty = self.rect.y - self.vScroll.offset + cy + self.font.line_height
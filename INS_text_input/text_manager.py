@@ -1,17 +1,106 @@
-from typing import List
+from array import array
 from .font_renderer import FontRenderer
+from .text_storage import create_storage, IntArray, MappedLines
+from .width_index import MaxWidthIndex
+from .undo_journal import INSERT, DELETE
+
+
+LAZY_MEASURE_BUDGET = 2048  # 惰性模式下每帧最多补测的行数
 
 
 class TextManager:
-    def __init__(self, text: str, font: FontRenderer):
-        self.text: List[str] = text.split('\n')  # 输入的普通文字
+    def __init__(self, text, font: FontRenderer, storage='list', lazy=False):
+        self.storage = storage  # 存储引擎：'list' 或 'rope'
+        mapped = not isinstance(text, str)  # text 也可以是已构建好的行存储（如内存映射的文件）
+        self.text = text if mapped else create_storage(storage, text.split('\n'))  # 输入的普通文字
+        line_count = len(self.text)
 
         self.font: FontRenderer = font
-        self.line_width = self.font.pre_render_text(text)  # 存储每一行行宽
-        self.max_line_width = max(self.line_width)  # 最大行宽（动态维护）
-
-    def get_line_width(self, row):  # 返回某行的宽度（像素）
-        return self.line_width[row]
+        if lazy:  # 惰性模式：行宽在首次可见或被用到时才测量，-1 表示尚未测量
+            line_width = array('i', [-1]) * line_count if mapped else [-1] * line_count
+            self.width_index = MaxWidthIndex()
+        else:
+            line_width = self.font.pre_render_text(list(text), False) if mapped else self.font.pre_render_text(text)
+            self.width_index = MaxWidthIndex(line_width)  # 行宽索引，用于动态维护最大行宽
+        # 存储每一行行宽（大文件使用紧凑的整数数组）
+        self.line_width = IntArray(line_width) if mapped else create_storage(storage, line_width)
+        self.unmeasured = line_count if lazy else 0  # 尚未测量的行数
+        self.measure_row = 0  # 逐帧补测行宽的进度
+        self.wrap = None  # 软换行索引（仅软换行模式）
+        self.journal = None  # 撤销记录
+        self.journal_depth = 0  # 大于 0 时不记录修改（内部嵌套调用，或正在撤销/重做）
+        self.version = 0  # 文本每修改一次加一，用于判断画面是否需要重绘
+
+    @property
+    def max_line_width(self):  # 最大行宽（惰性模式下为已测量行的最大值，随补测逐步修正）
+        return self.width_index.max
+
+    def get_line_width(self, row):  # 返回某行的宽度（像素），尚未测量时立即测量
+        width = self.line_width[row]
+        if width < 0:
+            width = self.line_width[row] = self.font.pre_render_string(self.text[row])
+            self.width_index.add(width)
+            self.unmeasured -= 1
+        return width
+
+    def refine_line_width(self, budget=LAZY_MEASURE_BUDGET):  # 补测至多 budget 行（None 为全部），返回是否测量了新行
+        if not self.unmeasured:
+            return False
+        length = len(self.text)
+        row = self.measure_row if budget is not None and self.measure_row < length else 0
+        end = length if budget is None else min(row + budget, length)
+        self.measure_row = end
+
+        line_width = self.line_width[row: end]
+        pending = [i for i, width in enumerate(line_width) if width < 0]
+        if not pending:
+            return False
+        lines = self.text[row: end]
+        widths = self.font.pre_render_text([lines[i] for i in pending], False)
+        for i, width in zip(pending, widths):
+            self.line_width[row + i] = width
+        self.width_index.update(widths)
+        self.unmeasured -= len(pending)
+        if isinstance(self.text, MappedLines):  # 后台补测会扫过整个文件，测量完的行不必继续占用内存
+            self.text.release_lines(row, end)
+        return True
+
+    def _set_line_width(self, row, width):  # 修改某行行宽，并同步行宽索引
+        old_width = self.line_width[row]
+        if old_width < 0:
+            self.width_index.add(width)
+            self.unmeasured -= 1
+        else:
+            self.width_index.replace(old_width, width)
+        self.line_width[row] = width
+        if self.wrap is not None:
+            self.wrap.invalidate(row)
+        self.version += 1
+
+    def _insert_line_width(self, row, widths):  # 在 row 处插入若干行的行宽
+        self.line_width[row: row] = widths
+        self.width_index.update(widths)
+        if self.wrap is not None:
+            self.wrap.insert(row, widths)
+        self.version += 1
+
+    def _delete_line_width(self, row0, row1):  # 删除 [row0, row1) 行的行宽
+        widths = self.line_width[row0: row1]
+        measured = [width for width in widths if width >= 0]
+        self.unmeasured -= len(widths) - len(measured)
+        self.width_index.discard(measured)
+        del self.line_width[row0: row1]
+        if self.wrap is not None:
+            self.wrap.delete(row0, row1)
+        self.version += 1
+
+    def _record_edit(self, kind, row, column, text, mergeable=False):  # 写入撤销记录，嵌套的修改只记录最外层
+        if self.journal is not None and not self.journal_depth and text:
+            self.journal.record(kind, row, column, text, mergeable)
+
+    def break_undo_group(self):  # 之后的输入不再与之前的输入合并为一步撤销
+        if self.journal is not None:
+            self.journal.seal()
 
     @staticmethod
     def _is_first_line(row):  # 光标是否在第一行
@@ -27,58 +116,74 @@ class TextManager:
     def _is_line_end(self, row, column):  # 光标是否在某一行的末尾
         return column == len(self.text[row])
 
+    def offset_pos(self, row, column, count):  # 从 (row, column) 移动 count 个字符后的位置（换行符算一个字符，负数向左）
+        text = self.text
+        if count < 0:
+            count = -count
+            while count > column and row > 0:
+                count -= column + 1
+                row -= 1
+                column = len(text[row])
+            return row, max(column - count, 0)
+        while column + count > len(text[row]) and row < len(text) - 1:
+            count -= len(text[row]) - column + 1
+            row += 1
+            column = 0
+        return row, min(column + count, len(text[row]))
+
     def _add_line_break_char(self, row, column):  # 在光标处添加换行符
+        self._record_edit(INSERT, row, column, '\n')
+
         # 获取光标前后的文本
         before_cursor_text = self.text[row][:column]
         after_cursor_text = self.text[row][column:]
 
         # 更新当前行的文本为光标前的部分
         self.text[row] = before_cursor_text
-        self.line_width[row] = self.font.pre_render_string(before_cursor_text)
+        self._set_line_width(row, self.font.pre_render_string(before_cursor_text))
 
         # 在新行插入光标后的文本
         self.text.insert(row + 1, after_cursor_text)
-        self.line_width.insert(row + 1, self.font.pre_render_string(after_cursor_text))
-
-        self.max_line_width = max(self.line_width)  # TODO: 时间复杂度高
+        self._insert_line_width(row + 1, [self.font.pre_render_string(after_cursor_text)])
 
     def _add_string(self, row, column, string):  # 添加文本（单行）
+        self._record_edit(INSERT, row, column, string, True)
+        old_width = self.get_line_width(row)  # 须在修改文字前读取：尚未测量的行会按当前文字测量
         current_line = self.text[row]
         self.text[row] = current_line[:column] + string + current_line[column:]
 
         string_width = self.font.pre_render_string(string)
-        self.line_width[row] += string_width
-        self.max_line_width = max(self.line_width[row], self.max_line_width)
+        self._set_line_width(row, old_width + string_width)
         return string_width
 
     def _add_text(self, row, column, lines):
         assert len(lines) > 1  # 需保证不止一行
+        self._record_edit(INSERT, row, column, '\n'.join(lines))
+        self.journal_depth += 1
 
         self._add_line_break_char(row, column)
         self._add_string(row, column, lines[0])
 
         width_last = self._add_string(row + 1, 0, lines[-1])
-        if len(lines) == 2:
-            return width_last
-
-        mid_lines = lines[1: -1]
-        self.text = self.text[:row + 1] + mid_lines + self.text[row + 1:]
+        if len(lines) > 2:
+            mid_lines = lines[1: -1]
+            self.text[row + 1: row + 1] = mid_lines  # 原地插入，不重建整个列表
 
-        mid_lines_width = self.font.pre_render_text(mid_lines, False)
-        self.line_width = self.line_width[:row + 1] + mid_lines_width + self.line_width[row + 1:]
-        self.max_line_width = max(max(mid_lines_width), self.max_line_width)
+            self._insert_line_width(row + 1, self.font.pre_render_text(mid_lines, False))
 
+        self.journal_depth -= 1
         return width_last
 
     def remove_line_break_char(self, row):  # 删除某行开头的换行符
         assert not self._is_first_line(row)  # 须确保不是第一行
 
         current_row = row - 1
+        self._record_edit(DELETE, current_row, len(self.text[current_row]), '\n')
 
+        width, current_width = self.get_line_width(row), self.get_line_width(current_row)  # 须在合并前读取
         self.text[current_row] += self.text.pop(row)  # 合并两行内容
-        self.line_width[current_row] += self.line_width.pop(row)  # 合并行宽
-
-        self.max_line_width = max(self.line_width[current_row], self.max_line_width)  # 重新计算最大宽度
+        self._delete_line_width(row, row + 1)
+        self._set_line_width(current_row, current_width + width)  # 合并行宽
         return current_row
 
     def remove_char(self, row, column):  # 删除某位置前的普通字符
@@ -87,26 +192,27 @@ class TextManager:
         current_col = column - 1
 
         char_code = self.text[row][current_col]
+        self._record_edit(DELETE, row, current_col, char_code, True)
+        old_width = self.get_line_width(row)
         self.text[row] = (
             self.text[row][:current_col] +
             self.text[row][column:]
         )  # 去除这个字符
 
-        self.line_width[row] -= self.font.pre_render_string(char_code)
-        self.max_line_width = max(self.line_width)  # TODO: 时间复杂度高
+        self._set_line_width(row, old_width - self.font.pre_render_string(char_code))
 
         return row, current_col, char_code   # 删除后光标应处于的位置，以及删除的字符
 
-    def delete_string(self, row, col1, col2, update_max_line_width=True):
+    def delete_string(self, row, col1, col2, mergeable=False):  # mergeable: 可与相邻的退格、删除合并为一步撤销
         string = self.text[row][col1:col2]
+        self._record_edit(DELETE, row, col1, string, mergeable)
+        old_width = self.get_line_width(row)
         self.text[row] = (
                 self.text[row][:col1] +
                 self.text[row][col2:]
         )  # 去除这个字符
 
-        self.line_width[row] -= self.font.pre_render_string(string)
-        if update_max_line_width:
-            self.max_line_width = max(self.line_width)  # TODO: 时间复杂度高
+        self._set_line_width(row, old_width - self.font.pre_render_string(string))
 
     def delete_text(self, begin, end):
         assert begin != end
@@ -116,17 +222,54 @@ class TextManager:
             self.delete_string(begin[0], begin[1], end[1])
             return
 
+        if self.journal is not None and not self.journal_depth:  # 被删除的文字只在撤销记录中保存一份
+            self._record_edit(DELETE, begin[0], begin[1], self.get_text(begin, end))
+        self.journal_depth += 1
+
         row0, row1 = begin[0], end[0]
         col0, col1 = begin[1], end[1]
 
-        self.delete_string(row0, col0, len(self.text[row0]), False)
-        self.delete_string(row1, 0, col1, False)
+        self.delete_string(row0, col0, len(self.text[row0]))
+        self.delete_string(row1, 0, col1)
 
         del self.text[row0 + 1: row1]
-        del self.line_width[row0 + 1: row1]
+        self._delete_line_width(row0 + 1, row1)
 
-        self.max_line_width = max(self.line_width)
         self.remove_line_break_char(row0 + 1)
+        self.journal_depth -= 1
+
+    def insert_text(self, row, column, text):  # 在任意位置插入文字（不移动光标）
+        lines = text.split('\n')
+        if len(lines) == 1:
+            self._add_string(row, column, text)
+        else:
+            self._add_text(row, column, lines)
+
+    def append_text(self, text):  # 在文本末尾追加文字（不移动光标，不记录撤销）
+        row = len(self.text) - 1
+        self.journal_depth += 1
+        self.insert_text(row, len(self.text[row]), text)
+        self.journal_depth -= 1
+
+    def remove_first_lines(self, count):  # 删除开头的 count 行（须保证至少保留一行）
+        assert 0 < count < len(self.text)
+        del self.text[0: count]
+        self._delete_line_width(0, count)
+        self.measure_row = max(self.measure_row - count, 0)
+        if self.journal is not None:  # 行号整体变化，之前的撤销记录不再有效
+            self.journal.clear()
+
+    def get_text_lines(self, begin, end):  # 与 get_text 相同，但返回各行组成的列表，不拼接整段文字
+        begin, end = min(begin, end), max(begin, end)
+        row0, row1 = begin[0], end[0]
+        col0, col1 = begin[1], end[1]
+
+        if row0 == row1:
+            return [self.text[row0][col0:col1]]
+        lines = [self.text[row0][col0:]]
+        lines.extend(self.text[row0 + 1: row1])
+        lines.append(self.text[row1][:col1])
+        return lines
 
     def get_text(self, begin, end):
         if begin == end:
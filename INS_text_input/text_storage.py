@@ -0,0 +1,393 @@
+import itertools
+import random
+import bisect
+import mmap
+from array import array
+import numpy as np
+
+
+CHUNK_SIZE = 256  # 每个叶子块存储的元素数
+LINE_INDEX_CHUNK = 1 << 24  # 建立行偏移索引时每次扫描的字节数
+
+
+class _RopeNode:
+    __slots__ = ('items', 'size', 'priority', 'left', 'right')
+
+    def __init__(self, items):
+        self.items = items  # 该节点存储的一段连续元素
+        self.size = len(items)  # 子树内的元素总数（即行数）
+        self.priority = random.random()
+        self.left = self.right = None
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _update(node):
+    node.size = _size(node.left) + _size(node.right) + len(node.items)
+
+
+def _merge(a, b):  # 合并两棵树，a 中所有元素排在 b 之前
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        a.right = _merge(a.right, b)
+        _update(a)
+        return a
+    b.left = _merge(a, b.left)
+    _update(b)
+    return b
+
+
+def _split(node, k):  # 拆分为前 k 个元素和其余元素
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if k <= left_size:
+        left, node.left = _split(node.left, k)
+        _update(node)
+        return left, node
+    k -= left_size
+    if k >= len(node.items):
+        node.right, right = _split(node.right, k - len(node.items))
+        _update(node)
+        return node, right
+
+    # 拆分点落在块内部，把块的后半部分拆成新节点
+    right = _RopeNode(node.items[k:])
+    del node.items[k:]
+    right_tree, node.right = node.right, None
+    _update(node)
+    return node, _merge(right, right_tree)
+
+
+def _build(items):  # 把一段元素按块构建成一棵树
+    root = None
+    for i in range(0, len(items), CHUNK_SIZE):
+        root = _merge(root, _RopeNode(items[i: i + CHUNK_SIZE]))
+    return root
+
+
+def _iter_chunks(node, start, stop):  # 中序遍历，按块产出区间 [start, stop) 内的元素
+    if node is None or start >= stop:
+        return
+    left_size = _size(node.left)
+    if start < left_size:
+        yield from _iter_chunks(node.left, start, stop)
+    length = len(node.items)
+    lo, hi = max(start - left_size, 0), min(stop - left_size, length)
+    if lo < hi:
+        yield node.items if hi - lo == length else node.items[lo: hi]
+    if stop > left_size + length:
+        yield from _iter_chunks(node.right, start - left_size - length, stop - left_size - length)
+
+
+def _iter_range(node, start, stop):
+    return itertools.chain.from_iterable(_iter_chunks(node, start, stop))
+
+
+class RopeList:  # 平衡树（分块 treap）实现的行存储，插入删除为 O(log n + 编辑量)
+    def __init__(self, items=()):
+        self.root = _build(list(items))
+
+    def __len__(self):
+        return _size(self.root)
+
+    def __iter__(self):
+        return _iter_range(self.root, 0, len(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, RopeList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return 'RopeList(%r)' % list(self)
+
+    def _normalize_index(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('RopeList index out of range')
+        return index
+
+    def _locate(self, index):  # 找到第 index 个元素所在的节点及块内下标
+        node = self.root
+        while True:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+                continue
+            index -= left_size
+            if index < len(node.items):
+                return node, index
+            index -= len(node.items)
+            node = node.right
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            assert step == 1
+            return list(_iter_range(self.root, start, stop))
+        node, offset = self._locate(self._normalize_index(index))
+        return node.items[offset]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            assert step == 1
+            left, right = _split(self.root, start)
+            _, right = _split(right, max(stop - start, 0))
+            self.root = _merge(_merge(left, _build(list(value))), right)
+            return
+        node, offset = self._locate(self._normalize_index(index))
+        node.items[offset] = value
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            self[index] = ()
+            return
+        self.pop(index)
+
+    def insert(self, index, value):
+        index = max(0, min(index if index >= 0 else index + len(self), len(self)))
+        if self.root is None:
+            self.root = _RopeNode([value])
+            return
+
+        # 沿途更新子树大小，直接插入所在块
+        node, base = self.root, 0
+        while True:
+            node.size += 1
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+                continue
+            if index - left_size <= len(node.items):
+                node.items.insert(index - left_size, value)
+                break
+            index -= left_size + len(node.items)
+            base += left_size + len(node.items)
+            node = node.right
+
+        if len(node.items) > CHUNK_SIZE * 2:  # 块过大，从中间拆开
+            base += _size(node.left)
+            self.root = _merge(*_split(self.root, base + CHUNK_SIZE))
+
+    def append(self, value):
+        self.insert(len(self), value)
+
+    def pop(self, index=-1):
+        index = self._normalize_index(index)
+
+        def _pop(node, index):
+            left_size = _size(node.left)
+            if index < left_size:
+                node.left, item = _pop(node.left, index)
+            elif index - left_size < len(node.items):
+                item = node.items.pop(index - left_size)
+                if not node.items:  # 块被删空，移除该节点
+                    return _merge(node.left, node.right), item
+            else:
+                node.right, item = _pop(node.right, index - left_size - len(node.items))
+            node.size -= 1
+            return node, item
+
+        self.root, value = _pop(self.root, index)
+        return value
+
+
+class IntArray(array):  # 紧凑的整数存储（每个元素 4 字节），支持用列表进行切片赋值
+    def __new__(cls, items=()):
+        return super().__new__(cls, 'i', items)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice) and not isinstance(value, array):
+            value = array('i', value)
+        super().__setitem__(index, value)
+
+
+def build_line_offsets(data):  # 分块扫描换行符，返回每行起始字节偏移（末尾附加哨兵）
+    offsets = array('Q', [0])
+    for base in range(0, len(data), LINE_INDEX_CHUNK):
+        chunk = np.frombuffer(data, np.uint8, min(LINE_INDEX_CHUNK, len(data) - base), base)
+        offsets.frombytes((np.flatnonzero(chunk == 10) + (base + 1)).astype(np.uint64).tobytes())
+    offsets.append(len(data) + 1)  # 哨兵：最后一行的结束位置 + 1
+    return offsets
+
+
+class MappedLines:  # 内存映射的只读文件 + 编辑叠加层（片段表），只解码被访问到的行
+    def __init__(self, path, encoding='utf-8'):
+        self.encoding = encoding
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件无法映射
+            self.data = b''
+        self.offsets = build_line_offsets(self.data)  # 行偏移索引
+        if hasattr(mmap, 'MADV_DONTNEED') and isinstance(self.data, mmap.mmap):
+            self.data.madvise(mmap.MADV_DONTNEED)  # 扫描过的页不必常驻，之后按需重新映射
+
+        # 片段表：range 片段指向原文件中的连续行，list 片段存放编辑后的行
+        self.pieces = [range(len(self.offsets) - 1)]
+        self.piece_start = [0]  # 每个片段第一行的行号
+        self.length = len(self.offsets) - 1
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def decode_line(self, line_index):  # 解码原文件中的某一行
+        start, end = self.offsets[line_index], self.offsets[line_index + 1] - 1
+        line = self.data[start: end]
+        if line.endswith(b'\r'):
+            line = line[:-1]
+        return line.decode(self.encoding, 'replace')
+
+    def __len__(self):
+        return self.length
+
+    def _iter_pieces(self, pieces):
+        for piece in pieces:
+            if isinstance(piece, range):
+                yield from map(self.decode_line, piece)
+            else:
+                yield from piece
+
+    def __iter__(self):
+        return self._iter_pieces(self.pieces)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, RopeList, MappedLines)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def _normalize_index(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('MappedLines index out of range')
+        return index
+
+    def _locate(self, index):  # 找到第 index 行所在的片段下标及片段内偏移
+        k = bisect.bisect_right(self.piece_start, index) - 1
+        return k, index - self.piece_start[k]
+
+    def _split(self, index):  # 保证 index 处是片段边界，返回以 index 开头的片段下标
+        if index >= self.length:
+            return len(self.pieces)
+        k, offset = self._locate(index)
+        if offset:
+            piece = self.pieces[k]
+            self.pieces[k: k + 1] = [piece[:offset], piece[offset:]]
+            self.piece_start.insert(k + 1, index)
+            k += 1
+        return k
+
+    def _reindex(self):  # 合并相邻的编辑片段并重新计算片段起始行号
+        pieces = []
+        for piece in self.pieces:
+            if not piece:
+                continue
+            if pieces and isinstance(piece, list) and isinstance(pieces[-1], list):
+                pieces[-1].extend(piece)
+            else:
+                pieces.append(piece)
+        self.pieces = pieces or [[]]
+        self.piece_start = [0]
+        self.piece_start.extend(itertools.accumulate(map(len, self.pieces[:-1])))
+        self.length = sum(map(len, self.pieces))
+
+    def _slice_pieces(self, start, stop):  # [start, stop) 行对应的各个片段（须保证 start < stop）
+        k0, offset0 = self._locate(start)
+        k1, offset1 = self._locate(stop - 1)
+        if k0 == k1:
+            return [self.pieces[k0][offset0: offset1 + 1]]
+        return [self.pieces[k0][offset0:], *self.pieces[k0 + 1: k1], self.pieces[k1][:offset1 + 1]]
+
+    def release_lines(self, start, stop):  # [start, stop) 行暂时不再需要：释放它们在原文件中的页，之后访问时重新映射
+        if not hasattr(mmap, 'MADV_DONTNEED') or not isinstance(self.data, mmap.mmap) or start >= stop:
+            return
+        for piece in self._slice_pieces(start, stop):
+            if isinstance(piece, range) and piece:
+                begin = self.offsets[piece[0]] // mmap.PAGESIZE * mmap.PAGESIZE  # 起点须按页对齐
+                end = self.offsets[piece[-1] + 1] - 1
+                if end > begin:
+                    self.data.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            assert step == 1
+            if start >= stop:
+                return []
+            return list(self._iter_pieces(self._slice_pieces(start, stop)))
+        k, offset = self._locate(self._normalize_index(index))
+        piece = self.pieces[k]
+        return self.decode_line(piece[offset]) if isinstance(piece, range) else piece[offset]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            assert step == 1
+            k0 = self._split(start)
+            k1 = self._split(max(start, stop))
+            self.pieces[k0: k1] = [list(value)]
+            self._reindex()
+            return
+        index = self._normalize_index(index)
+        k, offset = self._locate(index)
+        if isinstance(self.pieces[k], list):  # 已编辑过的行直接修改
+            self.pieces[k][offset] = value
+        else:
+            self[index: index + 1] = [value]
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            self[index] = ()
+            return
+        self.pop(index)
+
+    def insert(self, index, value):
+        index = max(0, min(index if index >= 0 else index + self.length, self.length))
+        k, offset = self._locate(index - 1) if index else (0, -1)
+        if isinstance(self.pieces[k], list):  # 插入位置紧挨编辑片段，原地插入
+            self.pieces[k].insert(offset + 1, value)
+            for i in range(k + 1, len(self.piece_start)):
+                self.piece_start[i] += 1
+            self.length += 1
+        else:
+            self[index: index] = [value]
+
+    def append(self, value):
+        self.insert(self.length, value)
+
+    def pop(self, index=-1):
+        index = self._normalize_index(index)
+        value = self[index]
+        k, offset = self._locate(index)
+        if isinstance(self.pieces[k], list) and len(self.pieces[k]) > 1:
+            del self.pieces[k][offset]
+            for i in range(k + 1, len(self.piece_start)):
+                self.piece_start[i] -= 1
+            self.length -= 1
+        else:
+            del self[index: index + 1]
+        return value
+
+
+STORAGE = {
+    'list': list,
+    'rope': RopeList,
+}
+
+
+def create_storage(storage, items):  # 根据名称创建存储引擎
+    if storage not in STORAGE:
+        raise ValueError(f"未知的存储引擎: {storage}")
+    return STORAGE[storage](items)
@@ -3,11 +3,11 @@ from .font_renderer import FontRenderer
 from .cursor import Cursor
 from .selected_manager import SelectedManager
 from .cursor_blink import CursorBlink
-import time
+from .frame_clock import FrameClock
 
 
 class Tool:  # 一些基础功能的封装
-    def __init__(self, rect, v_scroll, h_scroll, font, cursor, selected_manager, cursor_blink, multi_lines):
+    def __init__(self, rect, v_scroll, h_scroll, font, cursor, selected_manager, cursor_blink, multi_lines, clock):
         self.rect = rect
         self.vScroll: VScrollBar = v_scroll
         self.hScroll: HScrollBar = h_scroll
@@ -16,6 +16,7 @@ class Tool:  # 一些基础功能的封装
         self.cursor_blink: CursorBlink = cursor_blink
         self.selected_manager: SelectedManager = selected_manager
         self.multi_lines: bool = multi_lines
+        self.clock: FrameClock = clock
 
     def _move_cursor_in_rect(self, cx, cy):  # 把光标限制在可视区域里
         sx, sy = -self.hScroll.offset, -self.vScroll.offset
@@ -34,10 +35,44 @@ class Tool:  # 一些基础功能的封装
     def delete_selected_text(self):
         begin, end = self.selected_manager.begin.copy(), self.selected_manager.end.copy()
         self.selected_manager.stop_selected()
-        self.cursor.set_cursor_pos(*min(begin, end))
         self.cursor.delete_text(begin, end)
+        self.cursor.set_cursor_pos(*min(begin, end))
+        self.move_cursor_in_rect()
+
+    def undo(self):  # 撤销一步
+        self._restore_journal(self.cursor.journal.undo() if self.cursor.journal is not None else None)
+
+    def redo(self):  # 重做一步
+        self._restore_journal(self.cursor.journal.redo() if self.cursor.journal is not None else None)
+
+    def _restore_journal(self, pos):
+        if pos is None:
+            return
+        self.selected_manager.stop_selected()
+        self.cursor.set_cursor_pos(*pos)
         self.move_cursor_in_rect()
 
+    def trim_lines(self, count):  # 删除开头的 count 行，并同步光标、选区和滚动位置
+        wrap = self.cursor.wrap
+        removed_rows = wrap.row_of_line(count) if wrap is not None else count  # 被删除的视觉行数
+        self.cursor.remove_first_lines(count)
+        row, column = self.cursor.get_cursor_pos()
+        self.cursor.set_cursor_pos(*((row - count, column) if row >= count else (0, 0)))
+        for pos in (self.selected_manager.begin, self.selected_manager.end):
+            pos[0], pos[1] = (pos[0] - count, pos[1]) if pos[0] >= count else (0, 0)
+        self.vScroll.update_content_offset(self.vScroll.content_offset - removed_rows * self.font.line_height)
+
+    def get_visual_line_count(self):  # 视觉行数（软换行模式下一行可能占多个视觉行）
+        return self.cursor.wrap.total if self.cursor.wrap is not None else len(self.cursor.text)
+
+    def is_scrolled_to_bottom(self):  # 竖直方向是否已滚动到底部
+        content_length = self.get_visual_line_count() * self.font.line_height
+        return self.vScroll.content_offset >= content_length - self.vScroll.container_length
+
+    def scroll_to_bottom(self):
+        self.vScroll.update_content_length(self.get_visual_line_count() * self.font.line_height)
+        self.vScroll.update_content_offset(self.vScroll.max_content_offset())
+
     def set_cursor_screen_pos(self, rect, mouse_pos):
         mouse_x, mouse_y = mouse_pos
         if self.vScroll.scroll_dragging or self.hScroll.scroll_dragging:
@@ -52,9 +87,9 @@ class Tool:  # 一些基础功能的封装
     def selected_event_update(self, mouse_pos):
         if not self.selected_manager.is_selecting:
             return
-        if (time.time() - self.selected_manager.last_update) <= 1 / 45:
+        if (self.clock.now - self.selected_manager.last_update) <= 1 / 45:
             return
         self.set_cursor_screen_pos(self.rect, mouse_pos)
         self.move_cursor_in_rect()  # 很妙，这意味着超出范围越远，滚动越快
         self.selected_manager.set_end(self.cursor.get_cursor_pos())
-        self.selected_manager.last_update = time.time()
+        self.selected_manager.last_update = self.clock.now
@@ -0,0 +1,108 @@
+import sys
+from collections import deque
+
+
+UNDO_JOURNAL_BYTES = 4 << 20  # 撤销记录（含重做记录）占用内存的上限
+COALESCE_MAX_LENGTH = 1024  # 连续输入合并为一步时，单步最多包含的字符数
+
+INSERT, DELETE = 0, 1
+
+
+def get_end_pos(row, column, text):  # 在 (row, column) 处插入 text 后，text 末尾所在的位置
+    line_breaks = text.count('\n')
+    if not line_breaks:
+        return row, column + len(text)
+    return row + line_breaks, len(text) - text.rfind('\n') - 1
+
+
+def get_step_size(step):  # 一步记录大约占用的字节数
+    return sys.getsizeof(step) + sys.getsizeof(step[3])
+
+
+class UndoJournal:  # 基于操作的撤销/重做记录：只保存每次修改的位置和文字，不保存整个文本
+    def __init__(self, manager, max_bytes=UNDO_JOURNAL_BYTES):
+        self.manager = manager  # 文本管理器，提供 insert_text 与 delete_text
+        self.max_bytes = max_bytes
+        self.undo_steps = deque()  # 每一步为 [INSERT/DELETE, 行, 列, 文字]
+        self.redo_steps = []
+        self.bytes = 0  # 撤销与重做记录的总大小
+        self.mergeable = False  # 下一次修改能否与最后一步合并
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.bytes = 0
+        self.mergeable = False
+
+    def seal(self):  # 结束当前的合并，之后的修改另起一步
+        self.mergeable = False
+
+    def _push(self, step):
+        self.undo_steps.append(step)
+        self.bytes += get_step_size(step)
+        while self.bytes > self.max_bytes and self.undo_steps:  # 超出上限时丢弃最早的记录
+            self.bytes -= get_step_size(self.undo_steps.popleft())
+
+    def _merge(self, kind, row, column, text):  # 尝试与最后一步合并（连续输入、连续退格或连续删除）
+        # 返回未能合并的部分 (行, 列, 文字)，全部合并时返回 None
+        # 最后一步装满后，多出的字符另起一步，因此一次记录多个字符与逐个记录得到相同的步骤
+        if not self.mergeable or not self.undo_steps or '\n' in text:
+            return row, column, text
+        last = self.undo_steps[-1]
+        room = COALESCE_MAX_LENGTH - len(last[3])  # 最后一步还能容纳的字符数
+        if last[0] != kind or room <= 0:
+            return row, column, text
+        if kind == INSERT and get_end_pos(last[1], last[2], last[3]) == (row, column):
+            merged = [kind, last[1], last[2], last[3] + text[:room]]
+            rest = row, column + room, text[room:]
+        elif kind == DELETE and get_end_pos(row, column, text) == (last[1], last[2]):  # 退格
+            head = max(len(text) - room, 0)
+            merged = [kind, row, column + head, text[head:] + last[3]]
+            rest = row, column, text[:head]
+        elif kind == DELETE and (row, column) == (last[1], last[2]):  # 向后删除
+            merged = [kind, row, column, last[3] + text[:room]]
+            rest = row, column, text[room:]
+        else:
+            return row, column, text
+        self.bytes += get_step_size(merged) - get_step_size(last)
+        self.undo_steps[-1] = merged
+        return rest if rest[2] else None
+
+    def record(self, kind, row, column, text, mergeable=False):  # 记录一次修改（删除须在修改前记录）
+        for step in self.redo_steps:  # 新的修改使重做记录失效
+            self.bytes -= get_step_size(step)
+        self.redo_steps.clear()
+        rest = self._merge(kind, row, column, text) if mergeable else (row, column, text)
+        if rest is not None:
+            self._push([kind, *rest])
+        self.mergeable = mergeable
+
+    def _apply(self, kind, row, column, text):  # 执行一步修改，返回之后光标应处于的位置
+        if kind == INSERT:
+            self.manager.insert_text(row, column, text)
+            return get_end_pos(row, column, text)
+        self.manager.delete_text((row, column), get_end_pos(row, column, text))
+        return row, column
+
+    def undo(self):  # 撤销一步，返回光标位置；没有可撤销的记录时返回 None
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        self.mergeable = False
+        kind, row, column, text = step
+        self.manager.journal_depth += 1  # 撤销本身不再记录
+        pos = self._apply(DELETE if kind == INSERT else INSERT, row, column, text)
+        self.manager.journal_depth -= 1
+        return pos
+
+    def redo(self):  # 重做一步，返回光标位置；没有可重做的记录时返回 None
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        self.mergeable = False
+        self.manager.journal_depth += 1
+        pos = self._apply(*step)
+        self.manager.journal_depth -= 1
+        return pos
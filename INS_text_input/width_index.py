@@ -0,0 +1,45 @@
+from collections import Counter
+
+
+class MaxWidthIndex:  # 行宽直方图（行宽 -> 行数），内存与不同行宽的个数成正比，O(1) 更新，O(1) 查询最大值
+    def __init__(self, widths=()):
+        self.counts = Counter(widths)
+        self.max = max(self.counts, default=0)  # 当前最大行宽，只在最大行宽的行全部被删除时重新计算
+
+    def add(self, width):
+        self.counts[width] += 1
+        if width > self.max:
+            self.max = width
+
+    def remove(self, width):
+        self._decrease(width)
+        if width == self.max and width not in self.counts:
+            self._refresh_max()
+
+    def replace(self, old_width, new_width):  # 某一行的宽度发生变化
+        if old_width == new_width:
+            return
+        self.add(new_width)
+        self.remove(old_width)
+
+    def update(self, widths):
+        if not len(widths):
+            return
+        self.counts.update(widths)
+        self.max = max(self.max, max(widths))
+
+    def discard(self, widths):
+        for width in widths:
+            self._decrease(width)
+        if self.max not in self.counts:  # 批量删除后最多重新计算一次最大值
+            self._refresh_max()
+
+    def _decrease(self, width):
+        count = self.counts[width] - 1
+        if count:
+            self.counts[width] = count
+        else:
+            del self.counts[width]
+
+    def _refresh_max(self):  # 代价与不同行宽的个数成正比（行宽是有限的像素值，个数远小于行数）
+        self.max = max(self.counts, default=0)
@@ -0,0 +1,147 @@
+import bisect
+import numpy as np
+from .text_storage import IntArray
+
+
+WRAP_MARGIN = 6  # 折行宽度比文本框窄的像素数，给竖直滚动条和光标留出位置
+WRAP_REFINE_BUDGET = 256  # 每帧最多精确折行的行数
+
+
+def wrap_line(text, prefix_width, width):  # 贪心折行，优先在空格后断开，返回第二个及之后每个视觉行的起始列
+    breaks = []
+    start, length = 0, len(text)
+    while prefix_width[length] - prefix_width[start] > width:
+        end = bisect.bisect_right(prefix_width, prefix_width[start] + width, start + 1) - 1
+        end = max(end, start + 1)  # 单个字符比折行宽度还宽时，也至少放下一个字符
+        space = text.rfind(' ', start, end)
+        if space > start:
+            end = space + 1
+        breaks.append(end)
+        start = end
+    return tuple(breaks)
+
+
+class WrapIndex:  # 软换行索引：缓存每行的折行位置，用树状数组维护视觉行与逻辑行的对应关系
+    def __init__(self, manager, width):
+        self.manager = manager  # 文本管理器，提供 text、line_width、get_line_width 和 font
+        self.width = None
+        self.breaks = []  # 每行的折行位置，None 表示尚未精确折行（视觉行数为估算值）
+        self.counts = IntArray()  # 每行占用的视觉行数
+        self.tree = None  # counts 的树状数组（下标从 1 开始），行数变化后置空，使用时再整体重建
+        self.total = 0  # 视觉行总数
+        self.pending = 0  # 尚未精确折行的行数
+        self.refine_row = 0  # 逐帧补充折行的进度
+        self.set_width(width)
+
+    def estimate(self, line_width):  # 按行宽估算视觉行数（-1 表示行宽尚未测量）
+        return max(-(-line_width // self.width), 1)
+
+    def set_width(self, width):  # 修改折行宽度：全部行改为估算值，之后按需精确折行；返回宽度是否变化
+        width = max(width, 1)
+        if width == self.width:
+            return False
+        self.width = width
+        line_width = np.fromiter(self.manager.line_width, np.int64, len(self.manager.line_width))
+        counts = np.maximum(-(-line_width // width), 1).astype(np.int32)
+        self.counts = IntArray()
+        self.counts.frombytes(counts.tobytes())
+        self.breaks = [None] * len(self.counts)
+        self.tree = None
+        self.total = int(counts.sum())
+        self.pending = len(self.breaks)
+        self.refine_row = 0
+        return True
+
+    def _build(self):  # 向量化构建树状数组：tree[i] = counts[i - lowbit(i): i] 之和
+        counts = np.frombuffer(self.counts, np.int32)
+        prefix = np.zeros(len(counts) + 1, np.int64)
+        np.cumsum(counts, out=prefix[1:])
+        index = np.arange(1, len(counts) + 1)
+        self.tree = np.zeros(len(counts) + 1, np.int64)
+        self.tree[1:] = prefix[index] - prefix[index - (index & -index)]
+
+    def _set_count(self, row, count):
+        delta = count - self.counts[row]
+        if not delta:
+            return
+        self.counts[row] = count
+        self.total += delta
+        if self.tree is not None:
+            tree, i = self.tree, row + 1
+            while i < len(tree):
+                tree[i] += delta
+                i += i & -i
+
+    def row_of_line(self, row):  # 第 row 行的第一个视觉行的序号，O(log n)
+        if self.tree is None:
+            self._build()
+        tree, visual_row = self.tree, 0
+        while row > 0:
+            visual_row += tree[row]
+            row -= row & -row
+        return int(visual_row)
+
+    def locate(self, visual_row):  # 视觉行 -> (逻辑行, 在该行中是第几个视觉行)，O(log n)
+        if self.tree is None:
+            self._build()
+        tree, row = self.tree, 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if row + step < len(tree) and tree[row + step] <= visual_row:
+                row += step
+                visual_row -= tree[row]
+            step >>= 1
+        return row, int(visual_row)
+
+    def get_breaks(self, row, cache=True):  # 某行的折行位置，尚未折行时立即精确折行
+        breaks = self.breaks[row]
+        if breaks is None:
+            manager = self.manager
+            if manager.get_line_width(row) <= self.width:
+                breaks = ()
+            else:
+                text = manager.text[row]
+                font = manager.font
+                prefix_width = font.get_prefix_width(text) if cache else font.measure_prefix_width(text)
+                breaks = wrap_line(text, prefix_width, self.width)
+            self.breaks[row] = breaks
+            self.pending -= 1
+            self._set_count(row, len(breaks) + 1)
+        return breaks
+
+    def refine(self, budget=WRAP_REFINE_BUDGET):  # 精确折行至多 budget 行，逐步修正估算的视觉行数
+        if not self.pending:
+            return
+        length = len(self.breaks)
+        row = self.refine_row if self.refine_row < length else 0
+        end = min(row + budget, length)
+        breaks = self.breaks
+        for i in range(row, end):
+            if breaks[i] is None:
+                self.get_breaks(i, False)  # 不可见的行不占用前缀宽度缓存
+        self.refine_row = end
+
+    def invalidate(self, row):  # 某行内容发生变化，需要重新折行
+        if self.breaks[row] is not None:
+            self.breaks[row] = None
+            self.pending += 1
+        self._set_count(row, self.estimate(self.manager.line_width[row]))
+
+    def insert(self, row, widths):  # 在 row 处插入若干行
+        counts = [self.estimate(width) for width in widths]
+        self.counts[row: row] = counts
+        self.breaks[row: row] = [None] * len(counts)
+        self.total += sum(counts)
+        self.pending += len(counts)
+        self.tree = None
+        if row < self.refine_row:
+            self.refine_row += len(counts)
+
+    def delete(self, row0, row1):  # 删除 [row0, row1) 行
+        self.total -= sum(self.counts[row0: row1])
+        self.pending -= self.breaks[row0: row1].count(None)
+        del self.counts[row0: row1]
+        del self.breaks[row0: row1]
+        self.tree = None
+        if row0 < self.refine_row:
+            self.refine_row = max(self.refine_row - (row1 - row0), row0)
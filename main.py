@@ -1,7 +1,7 @@
 import pygame
 import sys
 import os
-from INS_text_input import TextInput
+from INS_text_input import TextInput, EventRouter
 
 
 os.environ["SDL_IME_SHOW_UI"] = "1"
@@ -20,18 +20,23 @@ with open('./demo.txt', 'r', encoding='utf-8') as f:
 
 
 entry_box = TextInput(screen_rect=screen.get_rect(),
-                      font=pygame.font.Font('CHSansSC.ttf', 16),
+                      font='CHSansSC.ttf',
                       font_size=16, font_color=(0, )*3, line_height=24,
                       rect=pygame.Rect(10, 10, w - 20, 24),
                       init_text=_init_text, multi_lines=False)
 entry_box.hScroll.visible = False
 
 input_box = TextInput(screen_rect=screen.get_rect(),
-                      font=pygame.font.Font('CHSansSC.ttf', 16),
+                      font='CHSansSC.ttf',
                       font_size=16, font_color=(0, )*3, line_height=24,
                       rect=pygame.Rect(10, 10 + 34, w - 20, h - 20 - 34),
                       init_text=_init_text, multi_lines=True)
 
+# 由分发器统一分发事件：键盘事件只发给拥有焦点的输入框，鼠标事件只发给被点击的输入框
+router = EventRouter()
+router.add(input_box)
+router.add(entry_box)
+
 
 while True:
     FPS = str(round(clock.get_fps()))
@@ -43,12 +48,12 @@ while True:
             pygame.quit()
             sys.exit()
     screen.fill((255,)*3)
+    router.handle_events(pygame_events, mouse_pos)
+
     pygame.draw.rect(screen, (0xdd,) * 3, input_box.rect.inflate(4, 4), width=2)
-    input_box.handle_events(pygame_events, mouse_pos)
     input_box.display(screen, mouse_pos)
 
     pygame.draw.rect(screen, (0xdd,) * 3, entry_box.rect.inflate(4, 4), width=2)
-    entry_box.handle_events(pygame_events, mouse_pos)
     entry_box.display(screen, mouse_pos)
 
     pygame.display.update()
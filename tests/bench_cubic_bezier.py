@@ -0,0 +1,51 @@
+# CubicBezier 微基准：逐个求解（SolveCurveX 的牛顿迭代/二分）、查找表、批量向量化 solve_many
+# 用法：python tests/bench_cubic_bezier.py
+# y-err 以高精度求解（epsilon=1e-15）的结果为参照；x-err 为求得的 t 在 x 方向的残差，三种方法都须小于 kBezierEpsilon
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from INS_Animation.easing_function import CubicBezier, PREDEFINED_EASING_PARAMS
+from INS_Animation.easing_function.cubic_bezier import kBezierEpsilon
+
+CURVES = dict(PREDEFINED_EASING_PARAMS, steep=(1.0, 0.0, 0.0, 1.0),
+              back_out=(0.34, 1.56, 0.64, 1.0), back_in_out=(0.68, -0.6, 0.32, 1.6))  # 后两条超出 [0, 1]
+COUNT = 20000
+
+
+def per_value_us(func, number=5):
+    return min(timeit.repeat(func, number=1, repeat=number)) / COUNT * 1e6
+
+
+def main():
+    rnd = random.Random(1)
+    xs = [0.0, 1.0] + [rnd.random() for _ in range(COUNT - 2)]  # 含两个端点
+    array = np.array(xs)
+    print('kBezierEpsilon = %g, %d progress values (random + endpoints)' % (kBezierEpsilon, COUNT))
+    print('%-12s %-36s %-36s %-36s' % ('curve', 'SolveCurveX (scalar)', 'table', 'solve_many'))
+    for name, params in CURVES.items():
+        exact, table = CubicBezier(*params), CubicBezier(*params).use_table()
+        reference = np.array([exact.SampleCurveY(exact.SolveCurveX(x, 1e-15)) for x in xs])
+        results = [
+            (per_value_us(lambda: [exact.Solve(x) for x in xs]), np.array([exact.Solve(x) for x in xs])),
+            (per_value_us(lambda: [table.Solve(x) for x in xs]), np.array([table.Solve(x) for x in xs])),
+            (per_value_us(lambda: exact.solve_many(array)), exact.solve_many(array)),
+        ]
+        solved_t = [
+            np.array([exact.SolveCurveX(x, kBezierEpsilon) for x in xs]),
+            np.array([table.SolveCurveXFromTable(x) for x in xs]),
+            exact.SolveCurveXMany(array, kBezierEpsilon),
+        ]
+        y_errors = [np.abs(ys - reference).max() for _, ys in results]
+        x_errors = [np.abs(((exact.ax_ * t + exact.bx_) * t + exact.cx_) * t - array).max() for t in solved_t]
+        print('%-12s' % name, *('%6.3fus y-err %.1e x-err %.1e' % (us, y_error, x_error)
+                                for (us, _), y_error, x_error in zip(results, y_errors, x_errors)))
+        assert max(x_errors) < kBezierEpsilon, (name, x_errors)
+
+
+if __name__ == '__main__':
+    main()
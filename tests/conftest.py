@@ -0,0 +1,33 @@
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import pytest
+
+
+@pytest.fixture(scope='session')
+def screen():
+    pygame.init()
+    return pygame.display.set_mode((800, 600))
+
+
+@pytest.fixture
+def make_input(screen):  # 创建使用 pygame 默认字体的输入框，测试结束后关闭
+    from INS_text_input import TextInput
+    created = []
+
+    def make(init_text='', path=None, **kwargs):
+        args = dict(screen_rect=screen.get_rect(), font=pygame.font.Font(None, 20), font_size=20,
+                    font_color=(0, 0, 0), line_height=24, rect=pygame.Rect(10, 10, 400, 300))
+        args.update(kwargs)
+        text_input = TextInput.from_file(path, **args) if path is not None else TextInput(init_text=init_text, **args)
+        created.append(text_input)
+        return text_input
+
+    yield make
+    for text_input in created:
+        text_input.close()
@@ -0,0 +1,28 @@
+# 日志模式：from_file 打开的文件（默认惰性测量）在末尾追加文字
+
+
+def write_log(tmp_path, count):
+    path = tmp_path / 'log.txt'
+    path.write_text('\n'.join('entry %d ok' % i for i in range(count)), encoding='utf-8')
+    return str(path)
+
+
+def test_append_to_mapped_file(make_input, tmp_path):
+    text_input = make_input(path=write_log(tmp_path, 5000), follow_tail=True)
+    assert text_input.cursor.line_width[-1] < 0  # 最后一行尚未测量
+    text_input.append_text('abc')
+    text_input.append_text(' def\nnext line')
+    text_input.flush_appended_text()
+    assert text_input.cursor.text[-2] == 'entry 4999 okabc def'
+    assert text_input.cursor.text[-1] == 'next line'
+    text_input.debug()
+
+
+def test_append_with_max_lines(make_input, tmp_path):
+    text_input = make_input(path=write_log(tmp_path, 1000), max_lines=500, follow_tail=True)
+    for i in range(300):
+        text_input.append_text('\nappended %d' % i)
+        text_input.flush_appended_text()
+    assert len(text_input.cursor.text) <= 500 + 500 // 4
+    assert text_input.cursor.text[-1] == 'appended 299'
+    text_input.debug()
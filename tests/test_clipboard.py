@@ -0,0 +1,38 @@
+import time
+import pytest
+from INS_text_input.clipboard import ClipBoard, FakeClipboard, get_clipboard_worker
+
+
+@pytest.fixture
+def slow_clipboard():
+    ClipBoard.backend = FakeClipboard('pasted', delay=0.05)
+    yield ClipBoard.backend
+    ClipBoard.backend = None
+
+
+def wait_for_clipboard():
+    worker = get_clipboard_worker()
+    deadline = time.time() + 5
+    while worker.pending > len(worker.results) and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_pending_paste_is_per_input(make_input, slow_clipboard):
+    first, second = make_input('a'), make_input('b')
+    first.shortcut.handle_paste()
+    assert first.is_animating()
+    assert not second.is_animating()
+    wait_for_clipboard()
+    second.shortcut.clipboard.poll()  # 由任意输入框处理已完成的请求
+    assert not first.is_animating()
+    assert first.cursor.text[0] == 'pasteda'
+
+
+def test_closed_input_ignores_paste(make_input, slow_clipboard):
+    first, second = make_input('a'), make_input('b')
+    first.shortcut.handle_paste()
+    first.close()
+    wait_for_clipboard()
+    second.shortcut.clipboard.poll()
+    assert first.cursor.text[0] == 'a'
+    assert get_clipboard_worker().pending == 0
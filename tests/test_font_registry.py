@@ -0,0 +1,11 @@
+import pygame
+from INS_text_input.font_renderer import get_font_renderer
+
+
+def test_shared_font_object_with_different_sizes(screen):
+    font = pygame.font.Font(None, 20)
+    small = get_font_renderer(font, 20, (0, 0, 0), 24)
+    large = get_font_renderer(font, 40, (0, 0, 0), 24)
+    assert small is not large
+    assert small is get_font_renderer(font, 20, (0, 0, 0), 24)
+    assert large.font_size == 40
@@ -0,0 +1,16 @@
+import pygame
+from INS_text_input.font_renderer import FontRenderer
+
+
+def test_entry_limit_is_restored_each_frame(screen):
+    renderer = FontRenderer(pygame.font.Font(None, 20), 20, (0, 0, 0), 24, glyph_cache_entries=50)
+    renderer.raster_budget = None
+    chars = [chr(code) for code in range(0x4e00, 0x4e00 + 400)]
+    renderer.begin_frame()
+    for char in chars:  # 一帧内用到的字形都不能淘汰
+        renderer.get_glyph(char)
+    assert renderer.glyph_cache_stats()['entries'] == 400
+    renderer.begin_frame()  # 之后没有新字符，缓存也要回到上限以内
+    stats = renderer.glyph_cache_stats()
+    assert stats['entries'] <= 50
+    assert stats['evictions'] == 350
@@ -0,0 +1,37 @@
+# 导入耗时基准：在子进程中用 -X importtime 测量 INS_text_input 自身的导入耗时（不含 pygame）
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_MS = 30  # 实测约 6ms，留出余量以适应较慢的机器
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, *options):
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # 导入耗时以已编译的 .pyc 为准
+    return subprocess.run([sys.executable, *options, '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure_import_ms():
+    stderr = run('import pygame; import INS_text_input', '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == 'INS_text_input':
+            return int(fields[1]) / 1000  # 累计耗时（微秒）
+    raise AssertionError('INS_text_input not found in -X importtime output')
+
+
+def test_import_time_budget():
+    run('import pygame; import INS_text_input')  # 先导入一次，写好 .pyc，不把编译时间计入
+    best = min(measure_import_ms() for _ in range(3))
+    assert best < IMPORT_TIME_BUDGET_MS, '%.1fms' % best
+
+
+def test_heavy_dependencies_load_on_first_use():
+    code = ('import sys, pygame, INS_text_input; '
+            'print(pygame.font.get_init(), *(name in sys.modules for name in ("pyperclip", "hashlib")))')
+    assert run(code).stdout.split()[-3:] == ['False'] * 3
+    code = 'import sys, INS_Animation; print("numpy" in sys.modules)'  # 缓动函数的标量计算不需要 numpy
+    assert run(code).stdout.split() == ['False']
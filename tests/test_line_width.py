@@ -0,0 +1,38 @@
+# 惰性测量模式下，在尚未测量的行上编辑后行宽必须与实际宽度一致
+
+
+def lazy_lines(count=1000):
+    return '\n'.join('line %d abc' % i for i in range(count))
+
+
+def test_insert_on_unmeasured_row(make_input):
+    text_input = make_input(lazy_lines(), lazy=True)
+    manager = text_input.cursor
+    assert manager.line_width[500] < 0
+    manager.insert_text(500, 3, 'xyz')
+    manager.insert_text(600, 0, 'a\nbb\nccc')
+    text_input.debug()
+
+
+def test_delete_on_unmeasured_row(make_input):
+    text_input = make_input(lazy_lines(), lazy=True)
+    manager = text_input.cursor
+    manager.remove_char(500, 4)
+    manager.delete_string(510, 0, 3)
+    manager.delete_text((520, 2), (530, 4))
+    text_input.debug()
+
+
+def test_join_unmeasured_rows(make_input):
+    text_input = make_input(lazy_lines(), lazy=True)
+    manager = text_input.cursor
+    assert manager.line_width[700] < 0 and manager.line_width[701] < 0
+    manager.remove_line_break_char(701)
+    text_input.debug()
+
+
+def test_append_to_unmeasured_last_row(make_input):
+    text_input = make_input(lazy_lines(5000), lazy=True)
+    text_input.append_text('abc')
+    text_input.flush_appended_text()
+    text_input.debug()
@@ -0,0 +1,43 @@
+# 惰性测量的后台补测扫过整个映射文件后，已测量行所在的页应被释放，不再常驻内存
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc/self/smaps')
+
+
+def mapped_rss_kb(path):  # 本进程中映射 path 的各段的常驻内存（KB）
+    total, current = 0, False
+    with open('/proc/self/smaps') as smaps:
+        for line in smaps:
+            fields = line.split()
+            if '-' in fields[0] and not fields[0].endswith(':'):
+                current = line.rstrip().endswith(path)
+            elif current and fields[0] == 'Rss:':
+                total += int(fields[1])
+    return total
+
+
+def write_big_file(tmp_path, count=200000):
+    path = tmp_path / 'big.txt'
+    path.write_text(''.join('line %d ' % i + 'x' * (i % 60) + '\n' for i in range(count)), encoding='utf-8')
+    return str(path)
+
+
+def test_sweep_releases_mapped_pages(make_input, tmp_path):
+    path = write_big_file(tmp_path)
+    manager = make_input(path=path).cursor
+    while manager.refine_line_width():
+        pass
+    assert manager.unmeasured == 0
+    assert mapped_rss_kb(path) < 2048  # 文件约 8MB
+    assert manager.text[123456] == 'line 123456 ' + 'x' * (123456 % 60)  # 释放后仍可重新读取
+
+
+def test_full_refine_releases_mapped_pages(make_input, tmp_path):
+    path = write_big_file(tmp_path)
+    manager = make_input(path=path).cursor
+    manager.refine_line_width(None)
+    assert manager.unmeasured == 0
+    assert mapped_rss_kb(path) < 2048
+    assert manager.max_line_width == max(manager.line_width)
@@ -0,0 +1,21 @@
+import pygame
+from INS_text_input import FrameClock
+from INS_text_input import select_menu
+
+
+def test_menu_damage_covers_menu_surface(make_input, screen, monkeypatch):
+    monkeypatch.setattr(select_menu, 'font', pygame.font.Font(None, 14))  # 测试环境中没有菜单字体文件
+    clock = FrameClock(virtual=True)
+    text_input = make_input('hello', clock=clock)
+    text_input.event.focus = True
+    click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=3, pos=(100, 100))
+    text_input.handle_events([click], (100, 100))
+    clock.advance(1)
+    text_input.display(screen, (100, 100))
+    rect = text_input.select_menu.rect
+    drawn = pygame.Rect(rect.topleft, (rect.w + 2, rect.h + 2))  # 菜单画布的实际区域
+    text_input.select_menu.close_menu()
+    clock.advance(1)  # 淡出结束，菜单不再绘制，上一帧的区域仍须重绘
+    dirty_rects = text_input.display(screen, (100, 100))
+    assert text_input.select_menu.alpha == 0
+    assert any(r.contains(drawn) for r in dirty_rects)
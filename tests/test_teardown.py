@@ -0,0 +1,27 @@
+# 反复创建、关闭输入框后不应留下任何引用
+import gc
+import weakref
+import pygame
+from INS_text_input import TextInput, EventRouter
+from INS_text_input import font_renderer
+
+
+def test_create_and_close_leaves_nothing(screen):
+    font = pygame.font.Font(None, 20)
+    router = EventRouter()
+    refs = []
+    for i in range(10000):
+        text_input = TextInput(screen.get_rect(), font, 20, (0, 0, 0), 24, pygame.Rect(10, 10, 200, 100),
+                               'text %d' % i)
+        router.add(text_input)
+        text_input.event.set_focus(True)
+        if i % 1000 == 0:
+            text_input.display(screen, (0, 0))
+            refs.append(weakref.ref(text_input))
+        text_input.close()
+    del text_input
+    gc.collect()
+    assert all(ref() is None for ref in refs)
+    assert len(TextInput.text_input_group) == 0
+    assert len(font_renderer._font_renderer_registry) == 0
+    assert not router.order and not router.grid and router.focused is None
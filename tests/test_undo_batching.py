@@ -0,0 +1,50 @@
+# 同一帧内合并的连续按键（count > 1）与逐个按键得到相同的文字和撤销步骤
+import random
+import pygame
+
+
+def run_keys(make_input, text, cursor_pos, keys, batched):
+    text_input = make_input(text)
+    text_input.cursor.set_cursor_pos(*cursor_pos)
+    keyboard = text_input.keyboard
+    handlers = {pygame.K_BACKSPACE: keyboard.handle_key_backspace, pygame.K_DELETE: keyboard.handle_key_delete}
+    for key, count in keys:
+        if batched:
+            handlers[key](count)
+        else:
+            for _ in range(count):
+                handlers[key]()
+    return text_input
+
+
+def assert_same(make_input, text, cursor_pos, keys):
+    batched = run_keys(make_input, text, cursor_pos, keys, True)
+    single = run_keys(make_input, text, cursor_pos, keys, False)
+    assert list(batched.cursor.text) == list(single.cursor.text)
+    assert list(batched.cursor.journal.undo_steps) == list(single.cursor.journal.undo_steps)
+    while batched.cursor.journal.undo_steps:
+        batched.tool.undo()
+    assert '\n'.join(batched.cursor.text) == text
+
+
+def test_backspace_across_lines(make_input):
+    assert_same(make_input, 'abc\ndefgh\nij', (2, 2), [(pygame.K_BACKSPACE, 3), (pygame.K_BACKSPACE, 4)])
+
+
+def test_delete_across_lines(make_input):
+    assert_same(make_input, 'abc\ndefgh\nij', (0, 1), [(pygame.K_DELETE, 4), (pygame.K_DELETE, 5)])
+
+
+def test_long_run_splits_like_single_keys(make_input):
+    keys = [(pygame.K_BACKSPACE, 7)] * 160  # 超过 COALESCE_MAX_LENGTH 个字符
+    assert_same(make_input, 'x' * 1200, (0, 1200), keys)
+
+
+def test_random_batches(make_input):
+    rnd = random.Random(7)
+    for _ in range(20):
+        text = '\n'.join(''.join(rnd.choice('ab ') for _ in range(rnd.randint(0, 12))) for _ in range(6))
+        lines = text.split('\n')
+        row = rnd.randrange(len(lines))
+        keys = [(rnd.choice((pygame.K_BACKSPACE, pygame.K_DELETE)), rnd.randint(1, 6)) for _ in range(6)]
+        assert_same(make_input, text, (row, rnd.randint(0, len(lines[row]))), keys)
@@ -0,0 +1,27 @@
+import random
+from INS_text_input.width_index import MaxWidthIndex
+
+
+def test_max_matches_multiset():
+    rnd = random.Random(2)
+    widths = [rnd.randint(0, 300) for _ in range(500)]
+    index = MaxWidthIndex(widths)
+    for _ in range(5000):
+        row = rnd.randrange(len(widths))
+        new_width = rnd.randint(0, 300)
+        index.replace(widths[row], new_width)
+        widths[row] = new_width
+        if rnd.random() < 0.05:
+            removed, widths = widths[:10], widths[10:] + [rnd.randint(0, 300) for _ in range(10)]
+            index.discard(removed)
+            index.update(widths[-10:])
+        assert index.max == max(widths)
+    index.discard(list(widths))
+    assert index.max == 0
+
+
+def test_memory_does_not_grow_with_edits():
+    index = MaxWidthIndex([100] * 1000)
+    for i in range(100000):  # 反复修改同一行
+        index.replace(100 + i % 50, 100 + (i + 1) % 50)
+    assert len(index.counts) <= 51